@@ -0,0 +1,315 @@
+"""Benchmarks Work Tracker's database queries and aggregations on synthetic data.
+
+Fills a database with realistic sessions (spread over several years and categories, with
+notes and a few open or uncategorized sessions), then times the query, statistics and
+export paths the app uses, as the median of several runs:
+
+    python benchmarks/database_queries.py --sessions 10000 100000 1000000 --output results.json
+    python benchmarks/database_queries.py --sessions 10000 100000 --compare results.json
+
+Generated databases are kept in --data-dir and reused by later runs with the same size and
+seed, since filling one with millions of sessions takes minutes. No display is needed.
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import numpy as np  # noqa: E402
+
+import exporter  # noqa: E402
+import stats_engine  # noqa: E402
+import timestamps  # noqa: E402
+from database import Database  # noqa: E402
+
+CATEGORIES = ["Work", "Skill", "School", "Reading", "Side Project", "Exercise", "Admin", "Research"]
+# Relative frequency of each category above; about 2% of sessions stay uncategorized
+CATEGORY_WEIGHTS = [30, 15, 15, 10, 10, 8, 7, 5]
+UNCATEGORIZED_SHARE = 0.02
+# Share of sessions that are still running (no end time)
+OPEN_SHARE = 0.001
+NOTE_WORDS = (
+    "review report draft meeting email refactor tests design sprint planning notes chapter "
+    "lecture exercise reading slides budget invoice deploy bugfix research paper outline "
+    "interview feedback roadmap database query chart export sync backup release"
+).split()
+INSERT_CHUNK = 50000
+
+
+def generate_sessions(count, years, seed, now):
+    """Yields `count` session rows (start_time, end_time, start_epoch, end_epoch, category, notes), oldest first."""
+    rng = random.Random(seed)
+    end_epoch_limit = int(now.timestamp())
+    first_epoch = end_epoch_limit - int(years * 365.25 * stats_engine.SECONDS_PER_DAY)
+    span_days = (end_epoch_limit - first_epoch) // stats_engine.SECONDS_PER_DAY
+    utc = datetime.timezone.utc
+
+    # Spread the sessions evenly over the days, then place each within working hours
+    day_offsets = sorted(rng.randrange(span_days) for _ in range(count))
+    for day_offset in day_offsets:
+        day_start = first_epoch - first_epoch % stats_engine.SECONDS_PER_DAY + day_offset * stats_engine.SECONDS_PER_DAY
+        start_epoch = day_start + rng.randrange(6 * 3600, 22 * 3600)
+        # Most sessions last 25-90 minutes, with a long tail of deep-work blocks
+        duration = min(int(rng.lognormvariate(8.2, 0.6)), 6 * 3600)
+        end_epoch = None if rng.random() < OPEN_SHARE else start_epoch + duration
+
+        if rng.random() < UNCATEGORIZED_SHARE:
+            category = None
+        else:
+            category = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+        notes = " ".join(rng.choices(NOTE_WORDS, k=rng.randint(2, 8)))
+
+        start_time = datetime.datetime.fromtimestamp(start_epoch, utc).strftime(timestamps.CANONICAL_FORMAT)
+        end_time = None if end_epoch is None else datetime.datetime.fromtimestamp(end_epoch, utc).strftime(timestamps.CANONICAL_FORMAT)
+        yield start_time, end_time, start_epoch, end_epoch, category, notes
+
+
+def build_database(db_path, count, years, seed, now):
+    """Creates a database at db_path holding `count` synthetic sessions."""
+    db = Database(db_path)
+    db.create_tables()
+    existing = set(db.get_all_categories())
+    for category in CATEGORIES:
+        if category not in existing:
+            db.insert_category(category)
+
+    category_ids = dict(db.conn.execute("SELECT name, id FROM categories"))
+    rows = generate_sessions(count, years, seed, now)
+    inserted = 0
+    while inserted < count:
+        chunk = [row[:4] + (category_ids.get(row[4]), row[5]) for _, row in zip(range(INSERT_CHUNK), rows)]
+        # One transaction per chunk; the FTS, rollup and stat-date triggers fire as in the app
+        with db.conn:
+            db.conn.executemany(
+                "INSERT INTO sessions (start_time, end_time, start_epoch, end_epoch, category_id, notes) VALUES (?,?,?,?,?,?)",
+                chunk
+            )
+        inserted += len(chunk)
+        print(f"  {inserted:,} / {count:,} sessions", end="\r", flush=True)
+    print()
+    db.conn.execute("ANALYZE")
+    db.conn.commit()
+    return db
+
+
+def open_database(data_dir, count, years, seed, now):
+    """Returns a Database with `count` sessions, reusing a previously generated file if there is one.
+
+    Also returns the time the data ends at, which the benchmarks use as "now" so that a
+    reused file answers the statistics views the same way as on the day it was generated.
+    """
+    db_path = os.path.join(data_dir, f"sessions-{count}-{years}y-seed{seed}.db")
+    if os.path.exists(db_path):
+        db = Database(db_path)
+        db.create_tables()
+        with db.read_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sessions")
+            if cursor.fetchone()[0] == count:
+                print(f"Reusing {db_path}")
+                return db, data_end(db)
+        db.close()
+        os.remove(db_path)
+
+    print(f"Generating {count:,} sessions in {db_path}")
+    started = time.perf_counter()
+    db = build_database(db_path, count, years, seed, now)
+    print(f"  generated in {time.perf_counter() - started:.1f} s")
+    return db, data_end(db)
+
+
+def data_end(db):
+    """Returns the start of the hour after the newest session."""
+    with db.read_cursor() as cursor:
+        cursor.execute("SELECT MAX(start_epoch) FROM sessions")
+        newest = cursor.fetchone()[0] or 0
+    return datetime.datetime.fromtimestamp(newest - newest % 3600 + 3600, datetime.timezone.utc)
+
+
+def benchmark_cases(db, now, export_dir):
+    """Returns [(name, function)]; each function runs one app code path and returns a row count."""
+    last_30_days = now - datetime.timedelta(days=30)
+
+    def stats_view(view):
+        period_start, _ = stats_engine.period_bounds(view, now)
+        rows = db.get_rollup(period_start, "All")
+        bucket_epochs = np.array([row[0] for row in rows], dtype=np.int64)
+        total_seconds = np.array([row[2] for row in rows], dtype=np.int64)
+        stats_engine.view_statistics(bucket_epochs, bucket_epochs + total_seconds, view, now=now)
+        return len(rows)
+
+    def daily_totals():
+        # The cloud sync recalculates the changed days from their session epochs
+        rows = db.get_session_epochs(now - datetime.timedelta(days=90), now)
+        start_epochs = np.array([row[0] for row in rows], dtype=np.float64)
+        end_epochs = np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=np.float64)
+        return len(stats_engine.daily_totals(start_epochs, end_epochs, 3600))
+
+    def deep_page():
+        # Follow the History window's "load more" through the first ten pages
+        key, rows = None, 0
+        for _ in range(10):
+            page, key = db.get_sessions_page(after=key)
+            rows += len(page)
+            if key is None:
+                break
+        return rows
+
+    def rename_category():
+        # Rename and rename back, so every run sees the same data
+        if not db.rename_category("Reading", "Reading (renamed)") or not db.rename_category("Reading (renamed)", "Reading"):
+            raise RuntimeError("rename_category failed")
+        # Sessions refer to the category by id, so a rename changes only its categories row
+        return 1
+
+    def export(export_format, **filters):
+        query, params = db.build_export_query(**filters)
+        file_path = os.path.join(export_dir, f"export.{export_format}")
+        with db.read_connection() as connection:
+            return exporter.export_sessions(connection, query, params, file_path, export_format)
+
+    cases = [
+        ("get_sessions", lambda: len(db.get_sessions())),
+        ("get_filtered_sessions[all]", lambda: len(db.get_filtered_sessions())),
+        ("get_filtered_sessions[30 days, category]", lambda: len(db.get_filtered_sessions(last_30_days, now, "Work"))),
+        ("get_filtered_sessions[search]", lambda: len(db.get_filtered_sessions(search_text="refactor"))),
+        ("get_sessions_page[first]", lambda: len(db.get_sessions_page()[0])),
+        ("get_sessions_page[10 pages]", deep_page),
+        ("get_sessions_page[search]", lambda: len(db.get_sessions_page(search_text="budget")[0])),
+        ("count_filtered_sessions[all]", lambda: db.count_filtered_sessions()),
+        ("count_filtered_sessions[search]", lambda: db.count_filtered_sessions(search_text="refactor")),
+        ("rename_category", rename_category),
+        ("daily_totals[90 days]", daily_totals),
+        ("export[csv, 30 days]", lambda: export("csv", start_date=last_30_days, end_date=now)),
+        ("export[csv, all]", lambda: export("csv")),
+    ]
+    cases[10:10] = [(f"statistics[{view}]", lambda view=view: stats_view(view)) for view in stats_engine.VIEWS]
+    if importlib.util.find_spec("pyarrow") is not None:
+        cases.append(("export[parquet, all]", lambda: export("parquet")))
+    return cases
+
+
+def time_case(function, runs):
+    """Runs function once to warm caches, then `runs` timed times; returns (timings, rows)."""
+    rows = function()
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings, rows
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(results, baseline_path, threshold):
+    """Prints each benchmark's change against a baseline file; returns the names that got slower than threshold."""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(entry["name"], entry["sessions"]): entry["median_seconds"] for entry in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["name"], entry["sessions"]))
+        if not before:
+            continue
+        ratio = entry["median_seconds"] / before
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- slower"
+            regressions.append(f"{entry['name']} @ {entry['sessions']:,}")
+        print(f"  {entry['name']:<42} {entry['sessions']:>12,}  {before * 1000:10.2f} ms -> "
+              f"{entry['median_seconds'] * 1000:10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10000, 100000],
+                        help="database sizes to benchmark (default: 10000 100000)")
+    parser.add_argument("--years", type=float, default=5, help="years of history to spread sessions over (default: 5)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated data (default: 1)")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per benchmark (default: 5)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "worktracker-benchmarks"),
+                        help="where generated databases are kept between runs")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="with --compare, exit with status 1 if a median grows by more than this factor (default: 1.25)")
+    args = parser.parse_args()
+
+    # The Database methods log every query; keep only real problems on the console
+    logging.basicConfig(level=logging.WARNING)
+    os.makedirs(args.data_dir, exist_ok=True)
+    generated_until = datetime.datetime.now(datetime.timezone.utc)
+
+    results = []
+    for count in args.sessions:
+        db, now = open_database(args.data_dir, count, args.years, args.seed, generated_until)
+        try:
+            with tempfile.TemporaryDirectory() as export_dir:
+                print(f"\n{count:,} sessions (median of {args.runs} runs):")
+                for name, function in benchmark_cases(db, now, export_dir):
+                    if args.filter and args.filter not in name:
+                        continue
+                    timings, rows = time_case(function, args.runs)
+                    median = statistics.median(timings)
+                    print(f"  {name:<42} {median * 1000:10.2f} ms  ({rows:,} rows)")
+                    results.append({
+                        "name": name,
+                        "sessions": count,
+                        "rows": rows,
+                        "runs": args.runs,
+                        "median_seconds": median,
+                        "min_seconds": min(timings),
+                        "max_seconds": max(timings),
+                    })
+        finally:
+            db.close()
+
+    report = {
+        "environment": {
+            "commit": git_commit(),
+            "recorded_at": datetime.datetime.now(datetime.timezone.utc).strftime(timestamps.CANONICAL_FORMAT),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "years": args.years,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than x{args.threshold}: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measures Work Tracker startup time.
+
+Prints the slowest top-level imports of main.py (from `python -X importtime`) and the time
+from process start until the first window is drawn, as the median of several runs:
+
+    python benchmarks/startup_time.py --runs 5
+
+The window runs need a display. Each run is started in a temporary directory, so the log
+files main.py creates there are thrown away with it.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(REPO_DIR, "main.py")
+
+
+def import_breakdown(work_dir):
+    """Returns [(module, cumulative_seconds)] for the top-level imports done by `import main`."""
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import main"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=work_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("Importing main.py failed:\n" + "\n".join(errors[-5:]))
+    # Modules are listed after the imports they triggered, indented two spaces per level, so
+    # main's own imports are the one-level entries that precede the top-level "main" line
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                break
+            totals = {}
+        elif depth == 1:
+            totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def time_to_first_window(work_dir, timeout):
+    """Starts the app and returns the seconds until it reports its first window as drawn."""
+    env = dict(os.environ, WORKTRACKER_EXIT_WHEN_READY="1")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, MAIN_PATH], cwd=work_dir, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        for line in process.stdout:
+            if line.strip() == "WORKTRACKER_READY":
+                return time.perf_counter() - started
+        raise RuntimeError(f"main.py exited with code {process.wait(timeout)} before its window appeared")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="window start-ups to time (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="imports to list (default: 15)")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for each run")
+    parser.add_argument("--imports-only", action="store_true", help="skip the window runs (no display needed)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        breakdown = import_breakdown(work_dir)
+        print(f"Slowest top-level imports of main.py (total {sum(s for _, s in breakdown) * 1000:.0f} ms):")
+        for module, seconds in breakdown[:args.top]:
+            print(f"  {seconds * 1000:8.1f} ms  {module}")
+
+        if args.imports_only:
+            return
+        timings = [time_to_first_window(work_dir, args.timeout) for _ in range(args.runs)]
+        print(f"Time to first window over {args.runs} runs: median {statistics.median(timings) * 1000:.0f} ms, "
+              f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Command-line interface for Work Tracker.
+
+Runs reports and maintenance against the database without opening the Tk window, so they
+can be scripted or scheduled:
+
+    python cli.py stats --view weekly --category Work
+    python cli.py export --output sessions.parquet --start 2024-01-01
+    python cli.py import --input sessions.csv
+    python cli.py sync --since 2024-05-01
+    python cli.py vacuum
+
+Every command prints a JSON object on stdout. Failures print {"error": ...} and exit with
+status 1. Log messages go to stderr (warnings only, unless --verbose is given).
+"""
+import argparse
+import csv
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import uuid
+
+import exporter
+import timestamps
+from database import Database, default_db_path
+
+# Outbox entries sent per upsert request by `sync`
+UPLOAD_BATCH_LIMIT = 500
+
+
+class CliError(Exception):
+    """A failure reported to the caller as {"error": message}."""
+
+
+def parse_date(text):
+    """argparse type for YYYY-MM-DD; returns the naive local midnight of that day."""
+    try:
+        return datetime.datetime.combine(datetime.date.fromisoformat(text), datetime.time.min)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected YYYY-MM-DD")
+
+
+def open_database(db_path, create=False):
+    """Opens and migrates the database; unless create is set, the file must already exist."""
+    if not create and not os.path.exists(db_path):
+        raise CliError(f"Database not found: {db_path}")
+    if create:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    db = Database(db_path)
+    if not db.conn:
+        raise CliError(f"Cannot open database: {db_path}")
+    db.create_tables()
+    return db
+
+
+def command_stats(db, args):
+    """Totals of one statistics view, as shown in the Statistics window."""
+    import numpy as np
+    import stats_engine
+
+    view = args.view.capitalize()
+    period_start, period_end = stats_engine.period_bounds(view)
+    rollup_rows = db.get_rollup(period_start, args.category)
+    # Each rollup row stands for the completed sessions that started in one UTC hour
+    bucket_epochs = np.array([row[0] for row in rollup_rows], dtype=np.int64)
+    total_seconds = np.array([row[2] for row in rollup_rows], dtype=np.int64)
+    result = stats_engine.view_statistics(bucket_epochs, bucket_epochs + total_seconds, view)
+
+    minutes_per_unit = 60 if result['unit'] == "Hours" else 1
+    return {
+        'view': view,
+        'category': args.category,
+        'period_start': period_start.isoformat(),
+        'period_end': period_end.isoformat(),
+        'unit': result['unit'],
+        'total_minutes': round(float(result['values'].sum()) * minutes_per_unit, 2),
+        'average_minutes': round(result['average_minutes'], 2),
+        'scorecard': result['scorecard_text'],
+        'has_data': result['has_data'],
+        'buckets': [
+            {'label': str(label), 'value': round(float(value), 2)}
+            for label, value in zip(result['labels'], result['values'])
+        ],
+    }
+
+
+def command_export(db, args):
+    """Streams the filtered sessions into a CSV, JSON Lines, Parquet or Excel file."""
+    export_format = args.format or exporter.format_for_path(args.output)
+    if export_format is None:
+        raise CliError(f"Cannot tell the export format from {args.output!r}; pass --format.")
+
+    query, params = db.build_export_query(args.start, args.end, args.category, args.search)
+    with db.read_connection() as connection:
+        rows = exporter.export_sessions(connection, query, params, args.output, export_format)
+    return {'path': os.path.abspath(args.output), 'format': export_format, 'rows': rows}
+
+
+def read_import_rows(file_path, import_format):
+    """Yields row dicts of a file written by the exporter."""
+    if import_format == 'csv':
+        with open(file_path, newline='', encoding='utf-8') as import_file:
+            yield from csv.DictReader(import_file)
+    elif import_format == 'jsonl':
+        with open(file_path, encoding='utf-8') as import_file:
+            for line in import_file:
+                if line.strip():
+                    yield json.loads(line)
+    elif import_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise CliError("Parquet import needs the 'pyarrow' library. Install it using 'pip install pyarrow'.")
+        yield from pq.read_table(file_path).to_pylist()
+    else:
+        raise CliError(f"Unsupported import format: {import_format}")
+
+
+def command_import(db, args):
+    """Adds the sessions of an exported file, skipping sessions that are already stored.
+
+    A session counts as already stored when one with the same start and end time, category
+    and notes exists, so importing the same file twice adds nothing.
+    """
+    import_format = args.format or exporter.format_for_path(args.input)
+    if import_format is None:
+        raise CliError(f"Cannot tell the import format from {args.input!r}; pass --format.")
+
+    known_sessions = {
+        (start_epoch, end_epoch, category, notes or "")
+        for start_epoch, end_epoch, category, notes in db.get_session_keys()
+    }
+    known_categories = set(db.get_all_categories())
+    summary = {'read': 0, 'imported': 0, 'skipped': 0, 'invalid': 0, 'categories_created': []}
+
+    with db.batch():
+        for row in read_import_rows(args.input, import_format):
+            summary['read'] += 1
+            try:
+                start_time = timestamps.parse_timestamp(str(row["Start Time"]))
+                end_text = row.get("End Time")
+                end_time = timestamps.parse_timestamp(str(end_text)) if end_text else None
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Skipping row {summary['read']} of {args.input}: {e}")
+                summary['invalid'] += 1
+                continue
+
+            category = row.get("Category") or None
+            if category == "Uncategorized":
+                category = None
+            notes = row.get("Notes") or ""
+            session_key = (timestamps.datetime_to_epoch(start_time), timestamps.datetime_to_epoch(end_time), category, notes)
+            if session_key in known_sessions:
+                summary['skipped'] += 1
+                continue
+
+            with db.operation():
+                if category and category not in known_categories:
+                    if not db.insert_category(category):
+                        raise CliError(f"Cannot create category {category!r}")
+                    known_categories.add(category)
+                    summary['categories_created'].append(category)
+                if db.insert_session(start_time, end_time, category, notes) is None:
+                    raise CliError(f"Cannot insert row {summary['read']} of {args.input}")
+            known_sessions.add(session_key)
+            summary['imported'] += 1
+    return summary
+
+
+def load_cloud_config():
+    """Returns (SUPABASE_URL, SUPABASE_KEY) from the config.json next to the app, or None."""
+    base_path = sys._MEIPASS if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_path, 'config.json')
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Cannot read {config_path}: {e}")
+        return None
+    if not config.get('SUPABASE_URL') or not config.get('SUPABASE_KEY'):
+        logging.warning(f"SUPABASE_URL or SUPABASE_KEY missing from {config_path}.")
+        return None
+    return config['SUPABASE_URL'], config['SUPABASE_KEY']
+
+
+def upload_outbox(db, client):
+    """Sends every due outbox entry once; failures stay queued for the app to retry.
+
+    Returns the number of entries uploaded and the names of the tables whose upload failed.
+    """
+    uploaded = 0
+    failed_tables = set()
+    while True:
+        due_entries = [
+            entry for entry in db.get_due_cloud_writes(time.time(), UPLOAD_BATCH_LIMIT)
+            if entry[0] not in failed_tables
+        ]
+        if not due_entries:
+            return uploaded, sorted(failed_tables)
+
+        entries_by_table = {}
+        for entry in due_entries:
+            entries_by_table.setdefault(entry[0], []).append(entry)
+        for table_name, entries in entries_by_table.items():
+            rows = [json.loads(entry[2]) for entry in entries]
+            if client.submit(client.upsert, table_name, rows).result():
+                db.complete_cloud_writes([(entry[0], entry[1], entry[4]) for entry in entries])
+                uploaded += len(entries)
+            else:
+                failed_tables.add(table_name)
+                logging.warning(f"Upload of {len(rows)} outbox entries to '{table_name}' failed; the app retries them later.")
+
+
+def command_sync(db, args):
+    """Recalculates leaderboard stats, queues them in the cloud outbox and uploads the outbox.
+
+    Without --since only the Lagos dates changed since the last sync are recalculated; with
+    it every date from then on that has sessions is recalculated as well.
+    """
+    import cloud
+
+    unsynced_dates = db.get_unsynced_stat_dates()
+    stat_dates = set()
+    if args.since:
+        since = args.since.date().isoformat()
+        unsynced_dates = [row for row in unsynced_dates if row[0] >= since]
+        since_start = cloud.stat_date_ranges([since])[0][0]
+        for start_epoch, _ in db.get_session_epochs(since_start):
+            stat_dates.add(datetime.datetime.fromtimestamp(start_epoch, cloud.LEADERBOARD_TIMEZONE).date().isoformat())
+    stat_dates.update(stat_date for stat_date, _ in unsynced_dates)
+    stat_dates = sorted(stat_dates)
+
+    summary = {'dates': stat_dates, 'queued': 0, 'uploaded': 0}
+    if stat_dates:
+        user_id = db.get_setting('local_unique_user_id')
+        if not user_id:
+            user_id = str(uuid.uuid4())
+            db.set_setting('local_unique_user_id', user_id)
+        display_name = db.get_setting('display_name') or f"User-{user_id[:8]}"
+
+        session_epochs = db.get_session_epochs_in_ranges(cloud.stat_date_ranges(stat_dates))
+        last_synced = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        rows = cloud.leaderboard_rows(user_id, display_name, stat_dates, session_epochs, last_synced)
+        if not db.enqueue_cloud_writes('leaderboard_stats', cloud.outbox_entries('leaderboard_stats', rows), time.time()):
+            raise CliError("Cannot queue daily stats in the cloud outbox.")
+        # Dates edited again since they were read stay marked for the next sync
+        db.mark_stat_dates_synced(unsynced_dates)
+        summary['queued'] = len(rows)
+
+    if args.no_upload:
+        summary['upload'] = "skipped"
+        return summary
+    if not cloud.SUPABASE_AVAILABLE:
+        summary['upload'] = "unavailable: Supabase library not installed"
+        return summary
+    config = load_cloud_config()
+    if config is None:
+        summary['upload'] = "unavailable: no Supabase settings in config.json"
+        return summary
+
+    client = cloud.CloudClient()
+    try:
+        client.submit(client.connect, *config).result()
+        summary['uploaded'], failed_tables = upload_outbox(db, client)
+        summary['upload'] = f"failed for {', '.join(failed_tables)}; queued for retry" if failed_tables else "done"
+    except Exception as e:
+        logging.error(f"Cloud upload failed: {e}")
+        summary['upload'] = f"failed: {e}"
+    finally:
+        client.executor.shutdown(wait=False)
+    return summary
+
+
+def command_vacuum(db, args):
+    """Compacts the database file."""
+    sizes_before, sizes_after = db.vacuum()
+    return {'path': os.path.abspath(db.db_path), 'before': sizes_before, 'after': sizes_after}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Work Tracker without the window. Prints JSON.")
+    parser.add_argument("--db", default=default_db_path(), help="database file (default: %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="log progress to stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats", help="totals of a statistics view")
+    stats_parser.add_argument("--view", choices=["daily", "weekly", "monthly", "yearly"], default="weekly")
+    stats_parser.add_argument("--category", default="All", help="category name, 'Uncategorized' or 'All' (default)")
+    stats_parser.set_defaults(handler=command_stats)
+
+    export_parser = subparsers.add_parser("export", help="export sessions to a file")
+    export_parser.add_argument("--output", required=True, help="file to write")
+    export_parser.add_argument("--format", choices=sorted(set(exporter.EXPORT_FORMATS.values())),
+                               help="default: taken from the --output extension")
+    export_parser.add_argument("--start", type=parse_date, help="first day, YYYY-MM-DD (local time)")
+    export_parser.add_argument("--end", type=parse_date, help="last day, YYYY-MM-DD (local time)")
+    export_parser.add_argument("--category", help="category name or 'Uncategorized'")
+    export_parser.add_argument("--search", help="text to search for in notes and categories")
+    export_parser.set_defaults(handler=command_export)
+
+    import_parser = subparsers.add_parser("import", help="add sessions from an exported file")
+    import_parser.add_argument("--input", required=True, help="CSV, JSON Lines or Parquet file from export")
+    import_parser.add_argument("--format", choices=sorted(set(exporter.EXPORT_FORMATS.values())),
+                               help="default: taken from the --input extension")
+    import_parser.set_defaults(handler=command_import, create=True)
+
+    sync_parser = subparsers.add_parser("sync", help="sync daily stats to the cloud leaderboard")
+    sync_parser.add_argument("--since", type=parse_date, help="also recalculate every date from YYYY-MM-DD on")
+    sync_parser.add_argument("--no-upload", action="store_true", help="only queue the stats; the app uploads them")
+    sync_parser.set_defaults(handler=command_sync)
+
+    vacuum_parser = subparsers.add_parser("vacuum", help="compact the database file")
+    vacuum_parser.set_defaults(handler=command_vacuum)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s - %(message)s", stream=sys.stderr)
+
+    db = None
+    try:
+        db = open_database(args.db, create=getattr(args, 'create', False))
+        result = args.handler(db, args)
+    except (CliError, OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+        print(json.dumps({'error': str(e)}))
+        return 1
+    finally:
+        if db:
+            db.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
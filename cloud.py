@@ -0,0 +1,157 @@
+"""Supabase access for Work Tracker.
+
+A CloudClient owns the Supabase client and a single network thread. Every request runs
+on that thread and is returned as a Future, so the Tk main loop never waits on the network.
+"""
+import concurrent.futures
+import datetime
+import importlib.util
+import json
+import logging
+import time
+
+# supabase itself is imported by connect(), on the network thread, to keep it out of startup
+SUPABASE_AVAILABLE = importlib.util.find_spec("supabase") is not None
+if not SUPABASE_AVAILABLE:
+    logging.error("Supabase Python library not found. Cloud sync functionality will be disabled. Please install it using 'pip install supabase'.")
+
+# Columns identifying a row of each Supabase table; outbox entries with the same key are merged
+ROW_KEYS = {
+    'leaderboard_stats': ('user_id', 'stat_date'),
+    'online_status': ('user_id',),
+}
+# Leaderboard stat dates are calendar dates in Lagos (WAT, UTC+1)
+LEADERBOARD_TIMEZONE = datetime.timezone(datetime.timedelta(hours=1), 'WAT')
+
+
+def outbox_entries(table_name, rows):
+    """Turns row dicts for a Supabase table into (row_key, payload) pairs for Database.enqueue_cloud_writes."""
+    key_columns = ROW_KEYS[table_name]
+    return [(json.dumps([row[column] for column in key_columns]), json.dumps(row)) for row in rows]
+
+
+def stat_date_ranges(stat_dates):
+    """Returns (start, end) UTC datetimes covering some Lagos stat dates, one range per run of consecutive dates.
+
+    Syncing an edit from long ago together with today then reads the sessions of those two
+    days only, not of everything in between.
+    """
+    runs = []
+    for stat_date in sorted({datetime.date.fromisoformat(stat_date) for stat_date in stat_dates}):
+        if runs and stat_date - runs[-1][1] == datetime.timedelta(days=1):
+            runs[-1][1] = stat_date
+        else:
+            runs.append([stat_date, stat_date])
+    return [
+        (datetime.datetime.combine(first_day, datetime.time.min, tzinfo=LEADERBOARD_TIMEZONE).astimezone(datetime.timezone.utc),
+         datetime.datetime.combine(last_day, datetime.time.max, tzinfo=LEADERBOARD_TIMEZONE).astimezone(datetime.timezone.utc))
+        for first_day, last_day in runs
+    ]
+
+
+def leaderboard_rows(user_id, display_name, stat_dates, session_epochs, last_synced):
+    """Builds the leaderboard_stats rows of the given Lagos stat dates.
+
+    session_epochs are the (start_epoch, end_epoch) pairs of every session on those dates.
+    Dates without completed sessions get zero totals, which corrects a leaderboard entry
+    whose sessions were all deleted.
+    """
+    import numpy as np
+    import stats_engine
+
+    start_epochs = np.array([row[0] for row in session_epochs], dtype=np.float64)
+    end_epochs = np.array([np.nan if row[1] is None else row[1] for row in session_epochs], dtype=np.float64)
+    offset_seconds = int(LEADERBOARD_TIMEZONE.utcoffset(None).total_seconds())
+    totals_by_date = stats_engine.daily_totals(start_epochs, end_epochs, offset_seconds)
+
+    empty_day = {'total_minutes': 0.0, 'longest_session_minutes': 0.0, 'total_sessions': 0}
+    rows = []
+    for stat_date in stat_dates:
+        day_totals = totals_by_date.get(stat_date, empty_day)
+        rows.append({
+            'user_id': user_id,
+            'display_name': display_name,
+            'stat_date': stat_date,
+            'total_sessions': day_totals['total_sessions'],
+            'total_duration_minutes': round(day_totals['total_minutes'], 2),
+            'longest_session_duration_minutes': round(day_totals['longest_session_minutes'], 2),
+            'last_synced': last_synced
+        })
+    return rows
+
+
+class CloudClient:
+    # Users whose last heartbeat is older than this many seconds count as offline
+    ONLINE_WINDOW_SECONDS = 60
+    # Presence results are reused for this long, so refreshes and reopened dialogs skip the network
+    PRESENCE_CACHE_SECONDS = 15
+
+    def __init__(self):
+        self.client = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="network")
+        # (excluded user ID, monotonic fetch time, users); only touched on the network thread
+        self.presence_cache = None
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    def submit(self, function, *args):
+        """Runs function(*args) on the network thread and returns a Future for its result."""
+        return self.executor.submit(function, *args)
+
+    def connect(self, supabase_url, supabase_key):
+        """Creates the Supabase client. Runs on the network thread; raises if the URL or key is invalid."""
+        if not SUPABASE_AVAILABLE:
+            raise RuntimeError("Supabase library not available.")
+        from supabase import create_client
+        self.client = create_client(supabase_url, supabase_key)
+        logging.info("Supabase client created successfully.")
+
+    def upsert(self, table_name, data):
+        """Upserts a row dict, or a list of row dicts in one request. Returns True on success."""
+        if not self.client:
+            logging.warning("Cannot send data to Supabase: Client not initialized.")
+            return False
+
+        try:
+            # Supabase identifies rows for upsert based on the primary key.
+            # For 'leaderboard_stats', the primary key is (user_id, stat_date).
+            response = self.client.table(table_name).upsert(data).execute()
+
+            if response and response.data:
+                logging.info(f"Upserted {len(response.data)} row(s) to Supabase table '{table_name}'.")
+                return True
+            logging.error(f"Failed to upsert data to Supabase table '{table_name}': {response.status_code if response else 'No response'}")
+            return False
+
+        except Exception as e:
+            logging.error(f"Error sending data to Supabase table '{table_name}': {e}", exc_info=True)
+            return False
+
+    def fetch_online_users(self, exclude_user_id=None):
+        """Returns [{'user_id', 'display_name'}] of users active within ONLINE_WINDOW_SECONDS.
+
+        The server does the filtering on last_active_at and user_id, and answers younger than
+        PRESENCE_CACHE_SECONDS are served from memory. Returns None if the query got no response.
+        """
+        if not self.client:
+            return None
+
+        now = time.monotonic()
+        if self.presence_cache:
+            cached_user_id, fetched_at, users = self.presence_cache
+            if cached_user_id == exclude_user_id and now - fetched_at < self.PRESENCE_CACHE_SECONDS:
+                return users
+
+        online_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.ONLINE_WINDOW_SECONDS)
+        query = self.client.table('online_status').select('user_id, display_name').gte('last_active_at', online_threshold.isoformat())
+        if exclude_user_id:
+            query = query.neq('user_id', exclude_user_id)
+        response = query.execute()
+        if response is None:
+            return None
+
+        users = [row for row in response.data or [] if row.get('user_id') and row.get('display_name')]
+        self.presence_cache = (exclude_user_id, now, users)
+        return users
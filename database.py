@@ -0,0 +1,1296 @@
+"""SQLite storage for Work Tracker sessions, categories and settings.
+
+Database owns the single writer connection; ReadConnectionPool hands out read-only
+connections for queries that may run on other threads. Nothing here needs a display,
+so scripts and benchmarks can use it directly.
+"""
+import contextlib
+import datetime
+import logging
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+
+import timestamps
+
+
+def default_db_path():
+    """Returns the path of the database the app uses, ~/WorkTracker/deep_work.db."""
+    return os.path.join(os.path.expanduser("~"), "WorkTracker", "deep_work.db")
+
+
+class ReadConnectionPool:
+    """A small pool of read-only SQLite connections that any thread can borrow.
+
+    With the database in WAL mode these readers see the last committed state and never
+    block, nor are blocked by, the single writer connection.
+    """
+
+    def __init__(self, db_path, size):
+        self.uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        return self.idle.get()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrows a read-only connection for the duration of the block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        """Closes the connections that are currently idle."""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Database:
+    # Bumped whenever migrate_schema gains a step; stored in PRAGMA user_version
+    SCHEMA_VERSION = 9
+    # Connections in the read-only pool used by READ_OPERATIONS
+    READ_POOL_SIZE = 3
+    # Methods that only read; db_worker runs them on the reader pool instead of the writer thread
+    READ_OPERATIONS = frozenset({
+        'get_session_by_id', 'get_sessions', 'get_filtered_sessions', 'get_sessions_page',
+        'count_filtered_sessions', 'get_session_epochs', 'get_session_epochs_in_ranges', 'get_session_keys', 'get_rollup', 'get_all_categories',
+        'get_setting', 'get_unsynced_stat_dates', 'get_due_cloud_writes', 'get_next_cloud_write_time',
+    })
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.cursor = None
+        self.fts_available = False
+        self.trigram_available = False
+        # True while db_worker runs a batch; writes then share one transaction
+        self.in_batch = False
+        self.read_pool = None
+        # Categories and settings are read far more often than they change, so create_tables
+        # loads them into memory and every write to them updates these copies. Writers replace
+        # the objects instead of mutating them, so any thread can read them without a lock.
+        self.category_cache = None # Tuple of category names in name order, None until loaded
+        self.settings_cache = None # Dict of setting key -> value, None until loaded
+        self.connect()
+
+    def connect(self):
+        """Establishes connection to the database."""
+        try:
+            self.conn = sqlite3.connect(self.db_path)
+            self.cursor = self.conn.cursor()
+            # WAL lets readers work alongside the writer, and with synchronous=NORMAL a commit
+            # only appends to the log instead of forcing an fsync of the main database file
+            self.cursor.execute("PRAGMA journal_mode=WAL")
+            self.cursor.execute("PRAGMA synchronous=NORMAL")
+            # sessions.category_id references categories.id
+            self.cursor.execute("PRAGMA foreign_keys=ON")
+            self.read_pool = ReadConnectionPool(self.db_path, self.READ_POOL_SIZE)
+            logging.info(f"Database connected at {self.db_path}")
+        except sqlite3.Error as e:
+            logging.error(f"Error connecting to database: {e}")
+            self.conn = None
+            self.cursor = None
+
+    @contextlib.contextmanager
+    def read_cursor(self):
+        """Yields a cursor on a pooled read-only connection."""
+        with self.read_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    @contextlib.contextmanager
+    def read_connection(self):
+        """Borrows a pooled read-only connection, e.g. for a long streaming export."""
+        with self.read_pool.connection() as conn:
+            yield conn
+
+    def _commit(self):
+        """Commits a write, unless it is part of a batch that commits as a whole."""
+        if not self.in_batch:
+            self.conn.commit()
+
+    def _rollback(self):
+        """Undoes a failed write; inside a batch only the current operation is undone."""
+        if self.in_batch:
+            self.cursor.execute("ROLLBACK TO db_operation")
+        else:
+            self.conn.rollback()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Runs several operations in a single transaction that commits once at the end."""
+        self.in_batch = True
+        try:
+            # Opened explicitly: otherwise the first operation's savepoint would be the outermost
+            # transaction, and releasing it would commit that operation on its own
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN")
+            yield
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            # The caches may already hold writes of this batch that were just undone
+            self.load_caches()
+            raise
+        finally:
+            self.in_batch = False
+
+    @contextlib.contextmanager
+    def operation(self):
+        """Wraps one operation of a batch in a savepoint so its failure leaves the others intact."""
+        self.cursor.execute("SAVEPOINT db_operation")
+        try:
+            yield
+        except Exception:
+            self.cursor.execute("ROLLBACK TO db_operation")
+            raise
+        finally:
+            self.cursor.execute("RELEASE db_operation")
+
+    def create_tables(self):
+        """Creates both sessions, categories, and settings tables."""
+        if not self.conn:
+            logging.error("Cannot create tables: No database connection.")
+            return
+
+        # The original layout; migrate_schema brings it up to date (e.g. category becomes category_id)
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS sessions(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_time TEXT,
+                    end_time TEXT,
+                    start_epoch INTEGER,
+                    end_epoch INTEGER,
+                    category TEXT,
+                    notes TEXT
+                )
+            """
+        )
+        logging.info("Sessions table checked/created.")
+
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS categories(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT UNIQUE NOT NULL
+                )
+            """
+        )
+        self.conn.commit()
+        logging.info("Categories table checked/created.")
+
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS settings(
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """
+        )
+        self.conn.commit()
+        logging.info("Settings table checked/created.")
+
+        self.cursor.execute("SELECT COUNT(*) FROM categories")
+        if self.cursor.fetchone()[0] == 0:
+            default_categories = ["Work", "Skill", "School"]
+            for category in default_categories:
+                try:
+                    self.cursor.execute("INSERT INTO categories (name) VALUES (?)", (category,))
+                    self.conn.commit()
+                    logging.info(f"Default category '{category}' added to categories table.")
+                except sqlite3.IntegrityError:
+                    logging.warning(f"Default category '{category}' already exists, skipping.")
+                except Exception as e:
+                    logging.error(f"Error adding default category '{category}': {e}")
+            logging.info("Default categories ensured in dedicated table.")
+
+        self.migrate_schema()
+        self.load_caches()
+
+    def migrate_schema(self):
+        """Brings an existing database up to SCHEMA_VERSION, one step at a time."""
+        self.cursor.execute("PRAGMA user_version")
+        version = self.cursor.fetchone()[0]
+        migrations = {
+            1: self._migrate_add_epoch_columns,
+            2: self._migrate_add_notes_fts,
+            3: self._migrate_add_daily_rollup,
+            4: self._migrate_add_start_epoch_index,
+            5: self._migrate_add_stat_sync_dates,
+            6: self._migrate_add_cloud_outbox,
+            7: self._migrate_canonical_timestamps,
+            8: self._migrate_category_ids,
+            9: self._migrate_add_notes_trigram,
+        }
+        for target_version in range(version + 1, self.SCHEMA_VERSION + 1):
+            migrations[target_version]()
+            self.cursor.execute(f"PRAGMA user_version = {target_version}")
+            self.conn.commit()
+            logging.info(f"Database schema migrated to version {target_version}.")
+
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions_fts'")
+        self.fts_available = self.cursor.fetchone() is not None
+        if not self.fts_available:
+            logging.warning("Full-text index unavailable; history search falls back to LIKE matching.")
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions_trigram'")
+        self.trigram_available = self.cursor.fetchone() is not None
+
+    def _migrate_add_epoch_columns(self):
+        """Adds integer UTC epoch columns, backfills them and indexes start_epoch."""
+        self.cursor.execute("PRAGMA table_info(sessions)")
+        existing_columns = {row[1] for row in self.cursor.fetchall()}
+        if 'start_epoch' not in existing_columns:
+            self.cursor.execute("ALTER TABLE sessions ADD COLUMN start_epoch INTEGER")
+        if 'end_epoch' not in existing_columns:
+            self.cursor.execute("ALTER TABLE sessions ADD COLUMN end_epoch INTEGER")
+
+        # Backfill in id order so large histories are converted in bounded chunks
+        last_id = 0
+        while True:
+            self.cursor.execute(
+                "SELECT id, start_time, end_time FROM sessions WHERE id > ? AND start_epoch IS NULL ORDER BY id LIMIT 1000",
+                (last_id,)
+            )
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for session_id, start_time_str, end_time_str in rows:
+                try:
+                    updates.append((timestamps.timestamp_to_epoch(start_time_str), timestamps.timestamp_to_epoch(end_time_str), session_id))
+                except ValueError:
+                    logging.warning(f"Could not parse timestamps of session {session_id} during migration; leaving epochs empty.")
+            self.cursor.executemany("UPDATE sessions SET start_epoch = ?, end_epoch = ? WHERE id = ?", updates)
+            last_id = rows[-1][0]
+
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_start_epoch_category ON sessions(start_epoch, category)"
+        )
+        logging.info("Session epoch columns backfilled and indexed.")
+
+    def _migrate_add_notes_fts(self):
+        """Creates the FTS5 index over session notes, its sync triggers, and backfills it."""
+        try:
+            self.cursor.execute(
+                """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                        notes,
+                        content='sessions',
+                        content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2',
+                        prefix='2 3'
+                    )
+                """
+            )
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 keep working with LIKE-based search
+            logging.warning(f"FTS5 not available in this SQLite build, skipping notes index: {e}")
+            return
+
+        self._create_fts_triggers()
+        self.cursor.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild')")
+        logging.info("Notes full-text index created and backfilled.")
+
+    def _create_fts_triggers(self, table='sessions_fts'):
+        """Creates the triggers that keep an external-content FTS5 table in step with sessions.notes."""
+        # External-content triggers as described in the SQLite FTS5 documentation
+        for statement in (
+            f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON sessions BEGIN
+                    INSERT INTO {table}(rowid, notes) VALUES (new.id, new.notes);
+                END
+            """,
+            f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON sessions BEGIN
+                    INSERT INTO {table}({table}, rowid, notes) VALUES ('delete', old.id, old.notes);
+                END
+            """,
+            f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF notes ON sessions BEGIN
+                    INSERT INTO {table}({table}, rowid, notes) VALUES ('delete', old.id, old.notes);
+                    INSERT INTO {table}(rowid, notes) VALUES (new.id, new.notes);
+                END
+            """,
+        ):
+            self.cursor.execute(statement)
+
+    def _migrate_add_notes_trigram(self):
+        """Creates a trigram index over session notes so substring searches stay indexed.
+
+        sessions_fts only matches word prefixes; this table finds text inside words,
+        as the LIKE search did before the full-text index existed.
+        """
+        try:
+            self.cursor.execute(
+                """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS sessions_trigram USING fts5(
+                        notes,
+                        content='sessions',
+                        content_rowid='id',
+                        tokenize='trigram'
+                    )
+                """
+            )
+        except sqlite3.OperationalError as e:
+            # Needs FTS5 and SQLite 3.34+; without it substring matches scan sessions.notes
+            logging.warning(f"FTS5 trigram tokenizer not available, skipping substring index: {e}")
+            return
+
+        self._create_fts_triggers('sessions_trigram')
+        self.cursor.execute("INSERT INTO sessions_trigram(sessions_trigram) VALUES ('rebuild')")
+        logging.info("Notes trigram index created and backfilled.")
+
+    def _migrate_add_daily_rollup(self):
+        """Creates the per-day/per-hour/per-category rollup table, its triggers, and backfills it.
+
+        Every completed session adds its duration to the UTC hour it started in. Triggers on
+        sessions keep the totals in step with inserts, edits, category renames and deletes.
+        """
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS daily_rollup(
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    category TEXT NOT NULL DEFAULT '',
+                    total_seconds INTEGER NOT NULL DEFAULT 0,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, hour, category)
+                ) WITHOUT ROWID
+            """
+        )
+
+        # '' stands for uncategorized sessions, since NULLs never conflict in a primary key
+        add_new = """
+            INSERT INTO daily_rollup(day, hour, category, total_seconds, session_count)
+            SELECT date(new.start_epoch, 'unixepoch'), CAST(strftime('%H', new.start_epoch, 'unixepoch') AS INTEGER),
+                   COALESCE(new.category, ''), new.end_epoch - new.start_epoch, 1
+            WHERE new.start_epoch IS NOT NULL AND new.end_epoch IS NOT NULL
+            ON CONFLICT(day, hour, category) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                session_count = session_count + excluded.session_count;
+        """
+        subtract_old = """
+            INSERT INTO daily_rollup(day, hour, category, total_seconds, session_count)
+            SELECT date(old.start_epoch, 'unixepoch'), CAST(strftime('%H', old.start_epoch, 'unixepoch') AS INTEGER),
+                   COALESCE(old.category, ''), old.start_epoch - old.end_epoch, -1
+            WHERE old.start_epoch IS NOT NULL AND old.end_epoch IS NOT NULL
+            ON CONFLICT(day, hour, category) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                session_count = session_count + excluded.session_count;
+            DELETE FROM daily_rollup WHERE session_count <= 0;
+        """
+        self.cursor.executescript(
+            f"""
+                CREATE TRIGGER IF NOT EXISTS daily_rollup_ai AFTER INSERT ON sessions BEGIN
+                    {add_new}
+                END;
+                CREATE TRIGGER IF NOT EXISTS daily_rollup_ad AFTER DELETE ON sessions BEGIN
+                    {subtract_old}
+                END;
+                CREATE TRIGGER IF NOT EXISTS daily_rollup_au AFTER UPDATE OF start_epoch, end_epoch, category ON sessions BEGIN
+                    {subtract_old}
+                    {add_new}
+                END;
+            """
+        )
+
+        self.cursor.execute("DELETE FROM daily_rollup")
+        self.cursor.execute(
+            """
+                INSERT INTO daily_rollup(day, hour, category, total_seconds, session_count)
+                SELECT date(start_epoch, 'unixepoch'), CAST(strftime('%H', start_epoch, 'unixepoch') AS INTEGER),
+                       COALESCE(category, ''), SUM(end_epoch - start_epoch), COUNT(*)
+                FROM sessions
+                WHERE start_epoch IS NOT NULL AND end_epoch IS NOT NULL
+                GROUP BY 1, 2, 3
+            """
+        )
+        logging.info("Daily rollup table created and backfilled.")
+
+    def _migrate_add_start_epoch_index(self):
+        """Indexes (start_epoch, id) so history pages can be read newest first without sorting."""
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start_epoch ON sessions(start_epoch)")
+
+    def _migrate_add_stat_sync_dates(self):
+        """Creates the table of leaderboard dates that still need a cloud sync, and its triggers.
+
+        Stat dates are Lagos (UTC+1) calendar dates. Any insert, delete or time change of a
+        session marks the dates it touches and bumps their generation, so a sync only clears
+        the dates that were not edited again while it was uploading. All dates that already
+        have sessions start out unsynced, so the first sync catches up on the whole history.
+        """
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS stat_sync_dates(
+                    stat_date TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL DEFAULT 1
+                ) WITHOUT ROWID
+            """
+        )
+
+        self._create_stat_sync_triggers()
+        self.cursor.execute(
+            """
+                INSERT OR IGNORE INTO stat_sync_dates(stat_date)
+                SELECT DISTINCT date(start_epoch, 'unixepoch', '+1 hour') FROM sessions WHERE start_epoch IS NOT NULL
+            """
+        )
+        logging.info("Cloud sync date tracking created and backfilled.")
+
+    def _create_stat_sync_triggers(self):
+        """Creates the triggers that mark the stat dates touched by session changes."""
+        def mark(row):
+            return f"""
+                INSERT INTO stat_sync_dates(stat_date)
+                SELECT date({row}.start_epoch, 'unixepoch', '+1 hour')
+                WHERE {row}.start_epoch IS NOT NULL
+                ON CONFLICT(stat_date) DO UPDATE SET generation = generation + 1;
+            """
+
+        for statement in (
+            f"""
+                CREATE TRIGGER IF NOT EXISTS stat_sync_dates_ai AFTER INSERT ON sessions BEGIN
+                    {mark('new')}
+                END
+            """,
+            f"""
+                CREATE TRIGGER IF NOT EXISTS stat_sync_dates_ad AFTER DELETE ON sessions BEGIN
+                    {mark('old')}
+                END
+            """,
+            f"""
+                CREATE TRIGGER IF NOT EXISTS stat_sync_dates_au AFTER UPDATE OF start_epoch, end_epoch ON sessions BEGIN
+                    {mark('old')}
+                    {mark('new')}
+                END
+            """,
+        ):
+            self.cursor.execute(statement)
+
+    def _migrate_add_cloud_outbox(self):
+        """Creates the outbox of Supabase rows waiting to be uploaded.
+
+        Entries are keyed by table and row key (a JSON array of the row's key columns),
+        so a newer payload for the same row replaces the pending one.
+        """
+        self.cursor.execute(
+            """
+                CREATE TABLE IF NOT EXISTS cloud_outbox(
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    PRIMARY KEY (table_name, row_key)
+                ) WITHOUT ROWID
+            """
+        )
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_cloud_outbox_next_attempt ON cloud_outbox(next_attempt_at)")
+
+    def _migrate_canonical_timestamps(self):
+        """Rewrites every session's start_time/end_time in the canonical timestamp form.
+
+        Older rows hold naive, "Z"-suffixed or microsecond timestamps. Rows are converted in
+        id-ordered chunks and only rewritten when their text changes; the epoch columns
+        already hold the same instants, so no rollup or search trigger fires.
+        """
+        last_id = 0
+        rewritten = 0
+        while True:
+            self.cursor.execute(
+                "SELECT id, start_time, end_time FROM sessions WHERE id > ? ORDER BY id LIMIT 1000",
+                (last_id,)
+            )
+            rows = self.cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for session_id, start_time_str, end_time_str in rows:
+                try:
+                    canonical = (timestamps.canonical_timestamp(start_time_str), timestamps.canonical_timestamp(end_time_str))
+                except ValueError:
+                    logging.warning(f"Could not parse timestamps of session {session_id} during migration; leaving them as they are.")
+                    continue
+                if canonical != (start_time_str or None, end_time_str or None):
+                    updates.append(canonical + (session_id,))
+            self.cursor.executemany("UPDATE sessions SET start_time = ?, end_time = ? WHERE id = ?", updates)
+            rewritten += len(updates)
+            last_id = rows[-1][0]
+        # Each distinct string was parsed once; the cache is not needed after the migration
+        timestamps.parse_timestamp.cache_clear()
+        logging.info(f"Rewrote {rewritten} session timestamps in canonical form.")
+
+    def _migrate_category_ids(self):
+        """Replaces the category name stored on each session with category_id, a key of categories.
+
+        A rename then only touches its categories row, and category filters compare integers.
+        SQLite cannot change a column in place, so sessions is copied into a new table with the
+        same ids and its indexes and triggers are recreated; daily_rollup, which only holds
+        derived totals, is rebuilt keyed by category_id. Names that sessions use but that are
+        missing from categories are added, so no session loses its label.
+        """
+        # The first write opens the transaction, so the rebuild below commits as a whole
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO categories (name) SELECT DISTINCT category FROM sessions WHERE category IS NOT NULL AND category != ''"
+        )
+        self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'sessions'")
+        row = self.cursor.fetchone()
+        last_session_id = row[0] if row else 0
+
+        self.cursor.execute("DROP TABLE IF EXISTS sessions_new")
+        self.cursor.execute(
+            """
+                CREATE TABLE sessions_new(
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_time TEXT,
+                    end_time TEXT,
+                    start_epoch INTEGER,
+                    end_epoch INTEGER,
+                    category_id INTEGER REFERENCES categories(id),
+                    notes TEXT
+                )
+            """
+        )
+        self.cursor.execute(
+            """
+                INSERT INTO sessions_new (id, start_time, end_time, start_epoch, end_epoch, category_id, notes)
+                SELECT s.id, s.start_time, s.end_time, s.start_epoch, s.end_epoch, c.id, s.notes
+                FROM sessions s LEFT JOIN categories c ON c.name = s.category
+            """
+        )
+        self.cursor.execute("DROP TABLE sessions")
+        self.cursor.execute("ALTER TABLE sessions_new RENAME TO sessions")
+        # Keep AUTOINCREMENT from handing out the ids of sessions deleted before the rebuild
+        self.cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'sessions'", (last_session_id,))
+
+        self.cursor.execute("CREATE INDEX idx_sessions_start_epoch ON sessions(start_epoch)")
+        # Serves category filters over a date range and the category_id lookups of deletes
+        self.cursor.execute("CREATE INDEX idx_sessions_category_start_epoch ON sessions(category_id, start_epoch)")
+
+        # sessions_fts keeps its rows: it indexes notes by session id, and the ids did not change
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions_fts'")
+        if self.cursor.fetchone():
+            self._create_fts_triggers()
+        self._create_stat_sync_triggers()
+        self._create_category_rollup()
+        logging.info("Sessions now reference categories by id.")
+
+    def _create_category_rollup(self):
+        """Creates daily_rollup keyed by (day, hour, category_id), its triggers, and backfills it.
+
+        Every completed session adds its duration to the UTC hour it started in. Triggers on
+        sessions keep the totals in step with inserts, edits and deletes; renaming a category
+        leaves them untouched.
+        """
+        self.cursor.execute("DROP TABLE IF EXISTS daily_rollup")
+        self.cursor.execute(
+            """
+                CREATE TABLE daily_rollup(
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    category_id INTEGER NOT NULL DEFAULT 0,
+                    total_seconds INTEGER NOT NULL DEFAULT 0,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, hour, category_id)
+                ) WITHOUT ROWID
+            """
+        )
+
+        # 0 stands for uncategorized sessions, since NULLs never conflict in a primary key
+        add_new = """
+            INSERT INTO daily_rollup(day, hour, category_id, total_seconds, session_count)
+            SELECT date(new.start_epoch, 'unixepoch'), CAST(strftime('%H', new.start_epoch, 'unixepoch') AS INTEGER),
+                   COALESCE(new.category_id, 0), new.end_epoch - new.start_epoch, 1
+            WHERE new.start_epoch IS NOT NULL AND new.end_epoch IS NOT NULL
+            ON CONFLICT(day, hour, category_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                session_count = session_count + excluded.session_count;
+        """
+        subtract_old = """
+            INSERT INTO daily_rollup(day, hour, category_id, total_seconds, session_count)
+            SELECT date(old.start_epoch, 'unixepoch'), CAST(strftime('%H', old.start_epoch, 'unixepoch') AS INTEGER),
+                   COALESCE(old.category_id, 0), old.start_epoch - old.end_epoch, -1
+            WHERE old.start_epoch IS NOT NULL AND old.end_epoch IS NOT NULL
+            ON CONFLICT(day, hour, category_id) DO UPDATE SET
+                total_seconds = total_seconds + excluded.total_seconds,
+                session_count = session_count + excluded.session_count;
+            DELETE FROM daily_rollup WHERE session_count <= 0;
+        """
+        for statement in (
+            f"""
+                CREATE TRIGGER daily_rollup_ai AFTER INSERT ON sessions BEGIN
+                    {add_new}
+                END
+            """,
+            f"""
+                CREATE TRIGGER daily_rollup_ad AFTER DELETE ON sessions BEGIN
+                    {subtract_old}
+                END
+            """,
+            f"""
+                CREATE TRIGGER daily_rollup_au AFTER UPDATE OF start_epoch, end_epoch, category_id ON sessions BEGIN
+                    {subtract_old}
+                    {add_new}
+                END
+            """,
+        ):
+            self.cursor.execute(statement)
+
+        self.cursor.execute(
+            """
+                INSERT INTO daily_rollup(day, hour, category_id, total_seconds, session_count)
+                SELECT date(start_epoch, 'unixepoch'), CAST(strftime('%H', start_epoch, 'unixepoch') AS INTEGER),
+                       COALESCE(category_id, 0), SUM(end_epoch - start_epoch), COUNT(*)
+                FROM sessions
+                WHERE start_epoch IS NOT NULL AND end_epoch IS NOT NULL
+                GROUP BY 1, 2, 3
+            """
+        )
+
+    @staticmethod
+    def build_fts_query(search_text):
+        """Turns free search text into an FTS5 MATCH expression.
+
+        Double-quoted parts become phrase queries, every other word becomes a prefix query,
+        and all parts must match.
+        """
+        terms = []
+        for index, part in enumerate(search_text.split('"')):
+            if index % 2:
+                # Inside a pair of quotes: keep the words together as a phrase
+                if part.strip():
+                    terms.append('"' + part.strip() + '"')
+            else:
+                terms.extend('"' + word.replace('"', '') + '"*' for word in part.split())
+        return " ".join(terms)
+
+    def _category_id(self, category):
+        """Returns (id, created) for a category name, creating the category if it does not exist yet.
+
+        The category boxes are editable, so a session may name a category nobody added.
+        Runs inside the caller's transaction; None and '' mean uncategorized.
+        """
+        if not category:
+            return None, False
+        self.cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (category,))
+        created = self.cursor.rowcount == 1
+        self.cursor.execute("SELECT id FROM categories WHERE name = ?", (category,))
+        return self.cursor.fetchone()[0], created
+
+    def _category_created(self, category):
+        """Adds a category created by _category_id to the cache once its write is committed."""
+        self._update_category_cache((self.category_cache or ()) + (category,))
+        logging.info(f"Category '{category}' created for a session.")
+
+    def insert_session(self, start_time, end_time, category, notes):
+        try:
+            # Convert to UTC before storing
+            start_time_str = timestamps.format_timestamp(start_time)
+            end_time_str = timestamps.format_timestamp(end_time)
+            category_id, category_created = self._category_id(category)
+
+            self.cursor.execute("""
+                INSERT INTO sessions (start_time, end_time, start_epoch, end_epoch, category_id, notes)
+                VALUES (?,?,?,?,?,?)
+                """, (start_time_str, end_time_str, timestamps.datetime_to_epoch(start_time), timestamps.datetime_to_epoch(end_time),
+                      category_id, notes))
+            self._commit()
+            last_id = self.cursor.lastrowid
+            if category_created:
+                self._category_created(category)
+            logging.info(f"Session inserted. ID: {last_id}")
+            return last_id
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error inserting session into DB: {e}", exc_info=True)
+            return None
+
+    def update_session(self, session_id, end_time, notes):
+        try:
+            # Convert to UTC before storing
+            end_time_str = timestamps.format_timestamp(end_time)
+
+            self.cursor.execute("""
+                UPDATE sessions
+                SET end_time = ?, end_epoch = ?, notes = ?
+                WHERE id = ?
+            """, (end_time_str, timestamps.datetime_to_epoch(end_time), notes, session_id))
+            self._commit()
+            logging.info(f"Session updated. ID: {session_id}")
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error updating session: {e}")
+            return False
+
+    def update_full_session(self, session_id, start_time, end_time, category, notes):
+        """Updates all fields of a session in the database."""
+        try:
+            # Convert to UTC before storing
+            start_time_str = timestamps.format_timestamp(start_time)
+            end_time_str = timestamps.format_timestamp(end_time)
+            category_id, category_created = self._category_id(category)
+
+            self.cursor.execute("""
+                UPDATE sessions
+                SET start_time = ?, end_time = ?, start_epoch = ?, end_epoch = ?,
+                    category_id = ?, notes = ?
+                WHERE id = ?
+            """, (start_time_str, end_time_str, timestamps.datetime_to_epoch(start_time), timestamps.datetime_to_epoch(end_time),
+                  category_id, notes, session_id))
+            self._commit()
+            if category_created:
+                self._category_created(category)
+            logging.info(f"Full session updated. ID: {session_id}")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error updating full session: {e}")
+            return False
+
+    def get_session_by_id(self, session_id):
+        """Gets a single session by its ID."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute(
+                    "SELECT s.id, s.start_time, s.end_time, c.name, s.notes FROM sessions s"
+                    " LEFT JOIN categories c ON c.id = s.category_id WHERE s.id = ?",
+                    (session_id,)
+                )
+                session = cursor.fetchone()
+                logging.debug(f"Session {session_id} retrieved.")
+                return session
+        except Exception as e:
+            logging.error(f"Error getting session by ID {session_id}: {e}")
+            return None
+
+    def get_sessions(self):
+        """Gets all sessions from database."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute(
+                    "SELECT s.id, s.start_time, s.end_time, c.name, s.notes FROM sessions s"
+                    " LEFT JOIN categories c ON c.id = s.category_id"
+                )
+                sessions = cursor.fetchall()
+                logging.debug(f"Sessions retrieved: {len(sessions)} rows.")
+                return sessions
+        except Exception as e:
+            logging.error(f"Error getting sessions: {e}")
+            return []
+
+    def _filtered_sessions_sql(self, start_date=None, end_date=None, category=None, search_text=None, with_names=True,
+                               with_rank=True):
+        """Builds the FROM/WHERE part shared by the filtered session queries.
+
+        Returns (sql, params, ranked); when ranked is True the sql joins a "hits" subquery
+        whose rank column orders full-text matches. With with_names the sql also joins the
+        categories table as "c", so c.name can be selected. Without with_rank the hits are
+        not scored and every rank is 0, which is enough for counting.
+        """
+        sql = " FROM sessions s"
+        if with_names:
+            sql += " LEFT JOIN categories c ON c.id = s.category_id"
+        params = []
+
+        fts_query = self.build_fts_query(search_text) if search_text and self.fts_available else ""
+        if fts_query:
+            # Notes hits come from the FTS index ranked by bm25; sessions whose notes contain the
+            # text inside a word or whose category name matches are appended after them, so the
+            # old "notes or category" substring search still works.
+            if self.trigram_available and len(search_text) >= 3:
+                # A quoted trigram phrase matches the text anywhere, without reading sessions
+                substring_hits = "SELECT rowid, 0 FROM sessions_trigram WHERE sessions_trigram MATCH ?"
+                substring_param = '"' + search_text.replace('"', '""') + '"'
+            else:
+                # Trigrams need three characters; shorter text scans the notes instead
+                substring_hits = "SELECT id, 0 FROM sessions WHERE notes LIKE ?"
+                substring_param = f"%{search_text}%"
+            sql += f"""
+                JOIN (
+                    SELECT id, MIN(rank) AS rank FROM (
+                        SELECT rowid AS id, {"rank" if with_rank else "0 AS rank"} FROM sessions_fts WHERE sessions_fts MATCH ?
+                        UNION ALL
+                        {substring_hits}
+                        UNION ALL
+                        SELECT id, 0 FROM sessions
+                        WHERE category_id IN (SELECT id FROM categories WHERE name LIKE ?)
+                    ) GROUP BY id
+                ) hits ON hits.id = s.id"""
+            params.extend([fts_query, substring_param, f"%{search_text}%"])
+        sql += " WHERE 1=1"
+
+        # Date ranges compare integer epochs so SQLite can seek idx_sessions_start_epoch
+        if start_date:
+            sql += " AND s.start_epoch >= ?"
+            params.append(timestamps.datetime_to_epoch(start_date))
+        if end_date:
+            if end_date.hour == 0 and end_date.minute == 0 and end_date.second == 0:
+                end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+            sql += " AND s.start_epoch <= ?"
+            params.append(timestamps.datetime_to_epoch(end_date))
+
+        if category and category != "All":
+            if category == "Uncategorized":
+                sql += " AND s.category_id IS NULL"
+            else:
+                # The name is looked up once; sessions are then matched on the integer key
+                sql += " AND s.category_id = (SELECT id FROM categories WHERE name = ?)"
+                params.append(category)
+
+        if search_text and not fts_query:
+            search_pattern = f"%{search_text}%"
+            sql += " AND (s.notes LIKE ? OR s.category_id IN (SELECT id FROM categories WHERE name LIKE ?))"
+            params.append(search_pattern)
+            params.append(search_pattern)
+
+        return sql, params, bool(fts_query)
+
+    def get_filtered_sessions(self, start_date=None, end_date=None, category=None, search_text=None):
+        """Gets sessions from database based on filters."""
+        try:
+            with self.read_cursor() as cursor:
+                sql, params, ranked = self._filtered_sessions_sql(start_date, end_date, category, search_text)
+                query = "SELECT s.id, s.start_time, s.end_time, c.name, s.notes" + sql
+                query += " ORDER BY hits.rank, s.start_epoch DESC, s.id DESC" if ranked else " ORDER BY s.start_epoch DESC, s.id DESC"
+
+                cursor.execute(query, tuple(params))
+                sessions = cursor.fetchall()
+                logging.debug(f"Filtered sessions retrieved: {len(sessions)} rows.")
+                return sessions
+        except Exception as e:
+            logging.error(f"Error getting filtered sessions: {e}")
+            return []
+
+    def get_sessions_page(self, start_date=None, end_date=None, category=None, search_text=None, after=None, limit=200):
+        """Gets one page of filtered sessions using keyset pagination.
+
+        Rows are ordered newest first by (start_epoch, id), or by search rank first when a
+        full-text search is active. Pass the returned key as `after` to fetch the next page;
+        the key is None once the last page has been returned.
+        """
+        try:
+            with self.read_cursor() as cursor:
+                sql, params, ranked = self._filtered_sessions_sql(start_date, end_date, category, search_text)
+                query = "SELECT s.id, s.start_time, s.end_time, c.name, s.notes, s.start_epoch"
+                query += ", hits.rank" if ranked else ", 0"
+                query += sql
+
+                order_by = " ORDER BY hits.rank, s.start_epoch DESC, s.id DESC" if ranked else " ORDER BY s.start_epoch DESC, s.id DESC"
+                if after:
+                    last_rank, last_epoch, last_id = after
+                    # Sessions without an epoch sort after all others in descending order
+                    if last_epoch is None:
+                        time_condition = "(s.start_epoch IS NULL AND s.id < ?)"
+                        time_params = [last_id]
+                    elif ranked:
+                        time_condition = "((s.start_epoch, s.id) < (?, ?) OR s.start_epoch IS NULL)"
+                        time_params = [last_epoch, last_id]
+                    else:
+                        # A bare row-value comparison lets SQLite seek idx_sessions_start_epoch
+                        time_condition = "(s.start_epoch, s.id) < (?, ?)"
+                        time_params = [last_epoch, last_id]
+                    if ranked:
+                        query += f" AND (hits.rank > ? OR (hits.rank = ? AND {time_condition}))"
+                        params.extend([last_rank, last_rank] + time_params)
+                    else:
+                        query += f" AND {time_condition}"
+                        params.extend(time_params)
+
+                cursor.execute(query + order_by + " LIMIT ?", tuple(params) + (limit,))
+                rows = cursor.fetchall()
+
+                if not ranked and after and after[1] is not None and len(rows) < limit:
+                    # The dated sessions ran out; continue with the ones that have no epoch
+                    sql, params, _ = self._filtered_sessions_sql(start_date, end_date, category, search_text)
+                    cursor.execute(
+                        "SELECT s.id, s.start_time, s.end_time, c.name, s.notes, s.start_epoch, 0" + sql
+                        + " AND s.start_epoch IS NULL ORDER BY s.id DESC LIMIT ?",
+                        tuple(params) + (limit - len(rows),)
+                    )
+                    rows += cursor.fetchall()
+
+                next_key = None
+                if len(rows) == limit:
+                    last_row = rows[-1]
+                    next_key = (last_row[6], last_row[5], last_row[0])
+                logging.debug(f"Session page retrieved: {len(rows)} rows.")
+                return [row[:5] for row in rows], next_key
+        except Exception as e:
+            logging.error(f"Error getting session page: {e}")
+            return [], None
+
+    def build_export_query(self, start_date=None, end_date=None, category=None, search_text=None):
+        """Returns (query, params) selecting every filtered session in History order for exporter."""
+        sql, params, ranked = self._filtered_sessions_sql(start_date, end_date, category, search_text)
+        query = "SELECT s.id, s.start_time, s.end_time, c.name, s.notes, s.start_epoch, s.end_epoch" + sql
+        query += " ORDER BY hits.rank, s.start_epoch DESC, s.id DESC" if ranked else " ORDER BY s.start_epoch DESC, s.id DESC"
+        return query, params
+
+    def count_filtered_sessions(self, start_date=None, end_date=None, category=None, search_text=None):
+        """Counts the sessions matching the given filters."""
+        try:
+            with self.read_cursor() as cursor:
+                sql, params, _ = self._filtered_sessions_sql(start_date, end_date, category, search_text,
+                                                                with_names=False, with_rank=False)
+                cursor.execute("SELECT COUNT(*)" + sql, tuple(params))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logging.error(f"Error counting filtered sessions: {e}")
+            return 0
+
+    def get_session_epochs(self, start_date=None, end_date=None):
+        """Gets (start_epoch, end_epoch) pairs of sessions that started within a date range."""
+        try:
+            with self.read_cursor() as cursor:
+                query = "SELECT start_epoch, end_epoch FROM sessions WHERE start_epoch IS NOT NULL"
+                params = []
+                if start_date:
+                    query += " AND start_epoch >= ?"
+                    params.append(timestamps.datetime_to_epoch(start_date))
+                if end_date:
+                    query += " AND start_epoch <= ?"
+                    params.append(timestamps.datetime_to_epoch(end_date))
+
+                cursor.execute(query, tuple(params))
+                return cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error getting session epochs: {e}")
+            return []
+
+    def get_session_epochs_in_ranges(self, date_ranges):
+        """Gets (start_epoch, end_epoch) pairs of sessions that started within any of some (start, end) date ranges."""
+        try:
+            with self.read_cursor() as cursor:
+                session_epochs = []
+                # One indexed range scan per range
+                for start_date, end_date in date_ranges:
+                    cursor.execute(
+                        "SELECT start_epoch, end_epoch FROM sessions WHERE start_epoch >= ? AND start_epoch <= ?",
+                        (timestamps.datetime_to_epoch(start_date), timestamps.datetime_to_epoch(end_date))
+                    )
+                    session_epochs.extend(cursor.fetchall())
+                return session_epochs
+        except Exception as e:
+            logging.error(f"Error getting session epochs in ranges: {e}")
+            return []
+
+    def get_session_keys(self):
+        """Gets (start_epoch, end_epoch, category, notes) of every session, e.g. to recognize sessions already imported."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute("""
+                    SELECT s.start_epoch, s.end_epoch, c.name, s.notes
+                    FROM sessions s LEFT JOIN categories c ON c.id = s.category_id
+                """)
+                return cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error getting session keys: {e}")
+            return []
+
+    def get_unsynced_stat_dates(self):
+        """Gets the (stat_date, generation) pairs of Lagos dates that changed since the last cloud sync."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute("SELECT stat_date, generation FROM stat_sync_dates ORDER BY stat_date")
+                return cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error getting unsynced stat dates: {e}")
+            return []
+
+    def mark_stat_dates_synced(self, date_generations):
+        """Clears synced dates, except those whose generation changed since they were read."""
+        try:
+            self.cursor.executemany(
+                "DELETE FROM stat_sync_dates WHERE stat_date = ? AND generation = ?",
+                [tuple(row) for row in date_generations]
+            )
+            self._commit()
+            logging.info(f"Marked {len(date_generations)} stat dates as synced.")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error marking stat dates as synced: {e}")
+            return False
+
+    def enqueue_cloud_writes(self, table_name, entries, enqueued_at):
+        """Adds (row_key, payload) entries to the cloud outbox, due immediately.
+
+        An entry for a row that is already pending replaces its payload and resets its retries,
+        unless the pending payload is newer.
+        """
+        try:
+            self.cursor.executemany(
+                """
+                    INSERT INTO cloud_outbox(table_name, row_key, payload, attempts, enqueued_at, next_attempt_at)
+                    VALUES (?, ?, ?, 0, ?, ?)
+                    ON CONFLICT(table_name, row_key) DO UPDATE SET
+                        payload = excluded.payload,
+                        attempts = 0,
+                        enqueued_at = excluded.enqueued_at,
+                        next_attempt_at = excluded.next_attempt_at
+                    WHERE excluded.enqueued_at >= cloud_outbox.enqueued_at
+                """,
+                [(table_name, row_key, payload, enqueued_at, enqueued_at) for row_key, payload in entries]
+            )
+            self._commit()
+            logging.info(f"Queued {len(entries)} rows for Supabase table '{table_name}'.")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error queueing cloud writes for '{table_name}': {e}")
+            return False
+
+    def get_due_cloud_writes(self, now, limit):
+        """Gets outbox entries (table_name, row_key, payload, attempts, enqueued_at) that are due by now."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute(
+                    """
+                        SELECT table_name, row_key, payload, attempts, enqueued_at FROM cloud_outbox
+                        WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?
+                    """,
+                    (now, limit)
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Error getting due cloud writes: {e}")
+            return []
+
+    def get_next_cloud_write_time(self):
+        """Gets the epoch time the next outbox entry is due, or None if the outbox is empty."""
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute("SELECT MIN(next_attempt_at) FROM cloud_outbox")
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logging.error(f"Error getting next cloud write time: {e}")
+            return None
+
+    def complete_cloud_writes(self, entry_keys):
+        """Removes uploaded (table_name, row_key, enqueued_at) entries, keeping any that were replaced since."""
+        try:
+            self.cursor.executemany(
+                "DELETE FROM cloud_outbox WHERE table_name = ? AND row_key = ? AND enqueued_at = ?",
+                entry_keys
+            )
+            self._commit()
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error completing cloud writes: {e}")
+            return False
+
+    def reschedule_cloud_writes(self, retries):
+        """Counts a failed attempt for (next_attempt_at, table_name, row_key, enqueued_at) entries."""
+        try:
+            self.cursor.executemany(
+                """
+                    UPDATE cloud_outbox SET attempts = attempts + 1, next_attempt_at = ?
+                    WHERE table_name = ? AND row_key = ? AND enqueued_at = ?
+                """,
+                retries
+            )
+            self._commit()
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error rescheduling cloud writes: {e}")
+            return False
+
+    def get_rollup(self, start_date=None, category=None):
+        """Gets hourly rollup rows (hour_start_epoch, category, total_seconds) from start_date onwards."""
+        try:
+            with self.read_cursor() as cursor:
+                query = """
+                    SELECT CAST(strftime('%s', r.day) AS INTEGER) + r.hour * 3600, c.name, r.total_seconds
+                    FROM daily_rollup r LEFT JOIN categories c ON c.id = r.category_id WHERE 1=1
+                """
+                params = []
+                if start_date:
+                    query += " AND r.day >= ?"
+                    params.append(start_date.astimezone(datetime.timezone.utc).date().isoformat())
+                if category == "Uncategorized":
+                    query += " AND r.category_id = 0"
+                elif category and category != "All":
+                    query += " AND r.category_id = (SELECT id FROM categories WHERE name = ?)"
+                    params.append(category)
+                query += " ORDER BY r.day, r.hour"
+
+                cursor.execute(query, tuple(params))
+                rows = cursor.fetchall()
+                logging.debug(f"Rollup rows retrieved: {len(rows)}")
+                return rows
+        except Exception as e:
+            logging.error(f"Error getting rollup rows: {e}")
+            return []
+
+    def load_caches(self):
+        """(Re)loads category_cache and settings_cache from the database."""
+        try:
+            self.cursor.execute("SELECT name FROM categories ORDER BY name")
+            self.category_cache = tuple(row[0] for row in self.cursor.fetchall())
+            self.cursor.execute("SELECT key, value FROM settings")
+            self.settings_cache = dict(self.cursor.fetchall())
+        except Exception as e:
+            # Without caches every lookup simply goes to the database
+            logging.error(f"Error loading category and settings caches: {e}")
+            self.category_cache = None
+            self.settings_cache = None
+
+    def _update_category_cache(self, names):
+        if self.category_cache is not None:
+            self.category_cache = tuple(sorted(names))
+
+    def get_all_categories(self):
+        """Gets all category names, from the cache once it is loaded."""
+        if self.category_cache is not None:
+            return list(self.category_cache)
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute("SELECT name FROM categories ORDER BY name")
+                categories = [row[0] for row in cursor.fetchall()]
+                logging.debug("All categories retrieved from dedicated table.")
+                return categories
+        except Exception as e:
+            logging.error(f"Error getting all categories: {e}")
+            return []
+
+    def insert_category(self, category_name):
+        """Inserts a new category into the dedicated categories table."""
+        try:
+            self.cursor.execute("INSERT INTO categories (name) VALUES (?)", (category_name,))
+            self._commit()
+            self._update_category_cache((self.category_cache or ()) + (category_name,))
+            logging.info(f"Category '{category_name}' inserted into dedicated table.")
+            return True
+        except sqlite3.IntegrityError:
+            self._rollback()
+            logging.warning(f"Category '{category_name}' already exists in dedicated table.")
+            return False
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error inserting category '{category_name}': {e}")
+            return False
+
+    def rename_category(self, old_category, new_category):
+        """Renames a category; sessions refer to it by id, so only its categories row changes."""
+        try:
+            self.cursor.execute("SELECT 1 FROM categories WHERE name = ? LIMIT 1", (new_category,))
+            if self.cursor.fetchone():
+                logging.warning(f"Cannot rename '{old_category}' to '{new_category}': New category name already exists.")
+                return False
+
+            self.cursor.execute("UPDATE categories SET name = ? WHERE name = ?", (new_category, old_category))
+            self._commit()
+            self._update_category_cache(new_category if name == old_category else name for name in self.category_cache or ())
+            logging.info(f"Category '{old_category}' renamed to '{new_category}'.")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error renaming category: {e}")
+            return False
+
+    def delete_category_from_db(self, category_name):
+        """Deletes a category from the categories table and updates associated sessions."""
+        try:
+            # idx_sessions_category_start_epoch finds the affected sessions without a table scan
+            self.cursor.execute(
+                "UPDATE sessions SET category_id = NULL WHERE category_id = (SELECT id FROM categories WHERE name = ?)",
+                (category_name,)
+            )
+            self.cursor.execute("DELETE FROM categories WHERE name = ?", (category_name,))
+            self._commit()
+            self._update_category_cache(name for name in self.category_cache or () if name != category_name)
+            logging.info(f"Category '{category_name}' deleted from categories table and sessions updated.")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error deleting category '{category_name}': {e}")
+            return False
+
+    def get_setting(self, key):
+        """Retrieves a setting value by its key, from the cache once it is loaded."""
+        if self.settings_cache is not None:
+            return self.settings_cache.get(key)
+        try:
+            with self.read_cursor() as cursor:
+                cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+                result = cursor.fetchone()
+                return result[0] if result else None
+        except Exception as e:
+            logging.error(f"Error getting setting '{key}': {e}")
+            return None
+
+    def set_setting(self, key, value):
+        """Inserts or updates a setting key-value pair."""
+        try:
+            self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+            self._commit()
+            if self.settings_cache is not None:
+                self.settings_cache = {**self.settings_cache, key: value}
+            logging.info(f"Setting '{key}' set to '{value}'.")
+            return True
+        except Exception as e:
+            self._rollback()
+            logging.error(f"Error setting setting '{key}': {e}")
+            return False
+
+    def file_sizes(self):
+        """Returns the sizes in bytes of the database file and its write-ahead log."""
+        sizes = {}
+        for name, path in (('database', self.db_path), ('wal', self.db_path + "-wal")):
+            sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+        return sizes
+
+    def vacuum(self):
+        """Compacts the database file and refreshes the query planner statistics.
+
+        Returns (sizes_before, sizes_after) as given by file_sizes().
+        """
+        sizes_before = self.file_sizes()
+        self.conn.commit()
+        if self.fts_available:
+            # Merges the full-text index segments left behind by many small inserts
+            self.cursor.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('optimize')")
+            self.conn.commit()
+        if self.trigram_available:
+            self.cursor.execute("INSERT INTO sessions_trigram(sessions_trigram) VALUES ('optimize')")
+            self.conn.commit()
+        self.cursor.execute("VACUUM")
+        self.cursor.execute("PRAGMA optimize")
+        self.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        sizes_after = self.file_sizes()
+        logging.info(f"Database vacuumed: {sizes_before['database']} -> {sizes_after['database']} bytes.")
+        return sizes_before, sizes_after
+
+    def close(self):
+        """Closes the database connection."""
+        if self.read_pool:
+            self.read_pool.close()
+        if self.conn:
+            self.conn.close()
+            logging.info("Database connection closed.")
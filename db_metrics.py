@@ -0,0 +1,143 @@
+"""Latency and queue statistics for Work Tracker's database commands.
+
+The DB worker records, for every command it runs, how long the command waited in the queue
+before it started and how long it took to execute, plus the rows it returned. Percentiles
+are computed over the most recent SAMPLE_SIZE commands of each operation, so the figures
+follow current behaviour while counts and maxima cover the whole session.
+"""
+import collections
+import datetime
+import json
+import math
+import threading
+
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def result_rows(result):
+    """Returns the number of rows in a command result, or None if it is not a row list."""
+    if isinstance(result, list):
+        return len(result)
+    # get_sessions_page returns (rows, next_key)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    return None
+
+
+class _OperationStats:
+    def __init__(self, sample_size):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.max_rows = 0
+        self.total_exec = 0.0
+        self.max_exec = 0.0
+        self.max_wait = 0.0
+        self.exec_samples = collections.deque(maxlen=sample_size)
+        self.wait_samples = collections.deque(maxlen=sample_size)
+
+
+class DbMetrics:
+    # Recent commands per operation kept for the percentiles
+    SAMPLE_SIZE = 1000
+
+    def __init__(self):
+        # Commands are recorded from the DB thread and every reader-pool thread
+        self.lock = threading.Lock()
+        self.reads_in_flight = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        with self.lock:
+            self.started_at = datetime.datetime.now(datetime.timezone.utc)
+            self.operations = {}
+            self.queue_depth_high_water = 0
+            self.batch_size_high_water = 0
+            # Reads already in flight keep counting; only the high-water mark starts over
+            self.reads_in_flight_high_water = self.reads_in_flight
+
+    def record(self, operation, wait_seconds, exec_seconds, rows=None, failed=False):
+        """Records one finished command."""
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = _OperationStats(self.SAMPLE_SIZE)
+            stats.count += 1
+            stats.errors += failed
+            stats.total_exec += exec_seconds
+            stats.max_exec = max(stats.max_exec, exec_seconds)
+            stats.exec_samples.append(exec_seconds)
+            if wait_seconds is not None:
+                stats.max_wait = max(stats.max_wait, wait_seconds)
+                stats.wait_samples.append(wait_seconds)
+            if rows is not None:
+                stats.rows += rows
+                stats.max_rows = max(stats.max_rows, rows)
+
+    def observe_batch(self, batch_size, queue_depth):
+        """Records the size of a batch drained from the queue and the commands still waiting behind it."""
+        with self.lock:
+            self.batch_size_high_water = max(self.batch_size_high_water, batch_size)
+            self.queue_depth_high_water = max(self.queue_depth_high_water, batch_size + queue_depth)
+
+    def read_submitted(self):
+        """Counts a read handed to the reader pool."""
+        with self.lock:
+            self.reads_in_flight += 1
+            self.reads_in_flight_high_water = max(self.reads_in_flight_high_water, self.reads_in_flight)
+
+    def read_finished(self):
+        with self.lock:
+            self.reads_in_flight -= 1
+
+    def snapshot(self):
+        """Returns the current figures as a JSON-serializable dict; times are in milliseconds.
+
+        Operations are listed slowest first by p95 execution time.
+        """
+        with self.lock:
+            operations = []
+            for name, stats in self.operations.items():
+                exec_samples = sorted(stats.exec_samples)
+                wait_samples = sorted(stats.wait_samples)
+                operations.append({
+                    'operation': name,
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'rows': stats.rows,
+                    'max_rows': stats.max_rows,
+                    'exec_ms': {
+                        'mean': stats.total_exec / stats.count * 1000,
+                        'p50': percentile(exec_samples, 0.50) * 1000,
+                        'p95': percentile(exec_samples, 0.95) * 1000,
+                        'p99': percentile(exec_samples, 0.99) * 1000,
+                        'max': stats.max_exec * 1000,
+                    },
+                    'wait_ms': {
+                        'p50': percentile(wait_samples, 0.50) * 1000,
+                        'p95': percentile(wait_samples, 0.95) * 1000,
+                        'p99': percentile(wait_samples, 0.99) * 1000,
+                        'max': stats.max_wait * 1000,
+                    } if wait_samples else None,
+                })
+            operations.sort(key=lambda entry: entry['exec_ms']['p95'], reverse=True)
+            return {
+                'since': self.started_at.isoformat(),
+                'sample_size': self.SAMPLE_SIZE,
+                'queue_depth_high_water': self.queue_depth_high_water,
+                'batch_size_high_water': self.batch_size_high_water,
+                'reads_in_flight': self.reads_in_flight,
+                'reads_in_flight_high_water': self.reads_in_flight_high_water,
+                'operations': operations,
+            }
+
+    def dump_json(self, file_path):
+        """Writes snapshot() to a JSON file."""
+        with open(file_path, 'w', encoding='utf-8') as dump_file:
+            json.dump(self.snapshot(), dump_file, indent=2)
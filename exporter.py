@@ -0,0 +1,166 @@
+"""Streaming export of work sessions to CSV, JSON Lines, Parquet and Excel.
+
+Rows are read from a database cursor in chunks and written as they arrive, so the
+full result set is never held in memory.
+"""
+import csv
+import json
+import logging
+import os
+
+import numpy as np
+
+import stats_engine
+
+# File extension -> export format
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.parquet': 'parquet',
+    '.xlsx': 'xlsx',
+}
+
+COLUMNS = ["ID", "Start Time", "End Time", "Category", "Notes", "Duration (minutes)"]
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled through its cancel event."""
+
+
+def format_for_path(file_path):
+    """Returns the export format for a file name, or None if the extension is unsupported."""
+    return EXPORT_FORMATS.get(os.path.splitext(file_path)[1].lower())
+
+
+def _chunk_rows(chunk):
+    """Turns database rows (id, start, end, category, notes, start_epoch, end_epoch) into export rows."""
+    start_epochs = np.array([np.nan if row[5] is None else row[5] for row in chunk], dtype=np.float64)
+    end_epochs = np.array([np.nan if row[6] is None else row[6] for row in chunk], dtype=np.float64)
+    durations = stats_engine.session_minutes(start_epochs, end_epochs)
+    return [
+        (row[0], row[1], row[2], row[3] if row[3] is not None else "Uncategorized", row[4],
+         None if np.isnan(duration) else round(float(duration), 2))
+        for row, duration in zip(chunk, durations)
+    ]
+
+
+class _CsvWriter:
+    def __init__(self, file_path):
+        self.file = open(file_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, file_path):
+        self.file = open(file_path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.writelines(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, file_path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs the 'pyarrow' library. Install it using 'pip install pyarrow'.")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("ID", pa.int64()),
+            ("Start Time", pa.string()),
+            ("End Time", pa.string()),
+            ("Category", pa.string()),
+            ("Notes", pa.string()),
+            ("Duration (minutes)", pa.float64()),
+        ])
+        self.writer = pq.ParquetWriter(file_path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+class _ExcelWriter:
+    def __init__(self, file_path):
+        try:
+            import openpyxl
+        except ImportError:
+            raise RuntimeError("Excel export needs the 'openpyxl' library. Install it using 'pip install openpyxl'.")
+        # Write-only workbooks stream rows to a temporary file instead of keeping every cell in memory
+        self.file_path = file_path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sessions")
+        self.sheet.append(COLUMNS)
+        self.closed = False
+
+    def write(self, rows):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        # A write-only workbook can only be saved once
+        if not self.closed:
+            self.closed = True
+            self.workbook.save(self.file_path)
+
+
+_WRITERS = {
+    'csv': _CsvWriter,
+    'jsonl': _JsonLinesWriter,
+    'parquet': _ParquetWriter,
+    'xlsx': _ExcelWriter,
+}
+
+
+def export_sessions(connection, query, params, file_path, export_format, chunk_size=5000,
+                    progress_callback=None, cancel_event=None):
+    """Streams the rows of a session query into a file and returns the number of rows written.
+
+    The query must select (id, start_time, end_time, category, notes, start_epoch, end_epoch).
+    Output goes to a temporary file that only replaces file_path once the export completes;
+    a set cancel_event stops the export and raises ExportCancelled.
+    """
+    if export_format not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    temp_path = file_path + ".part"
+    writer = _WRITERS[export_format](temp_path)
+    rows_written = 0
+    try:
+        cursor = connection.execute(query, tuple(params))
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            writer.write(_chunk_rows(chunk))
+            rows_written += len(chunk)
+            if progress_callback:
+                progress_callback(rows_written)
+        writer.close()
+        os.replace(temp_path, file_path)
+        logging.info(f"Exported {rows_written} sessions to {file_path}")
+        return rows_written
+    except BaseException:
+        writer.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,105 @@
+"""Logging configuration for Work Tracker.
+
+configure_logging() installs one pipeline for the whole app: every logging call only puts
+the record on a queue (a QueueHandler on the root logger), and a QueueListener thread does
+the formatting and the disk I/O into a size-rotated log file and the console. The UI, DB
+and network threads therefore never wait on the disk.
+
+Messages repeated from the same line of code are rate limited before they are queued:
+after RATE_LIMIT_BURST records in RATE_LIMIT_WINDOW_SECONDS, further records from that
+line are dropped until the window ends, and the next one that gets through says how many
+were suppressed. Errors are never dropped.
+
+The level can be changed without editing code through the WORKTRACKER_LOG_LEVEL
+environment variable (e.g. WORKTRACKER_LOG_LEVEL=DEBUG).
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOG_FILE = "app.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(threadName)s - %(message)s"
+LOG_LEVEL = "INFO"
+CONSOLE_LEVEL = "WARNING"
+# app.log is rotated at this size, keeping this many old files (app.log.1, app.log.2, ...)
+MAX_LOG_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+# Records allowed per line of code per window before that line is muted
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_WINDOW_SECONDS = 60
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops records beyond a burst per call site and window; records at ERROR and above always pass."""
+
+    def __init__(self, burst=RATE_LIMIT_BURST, window_seconds=RATE_LIMIT_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        # (pathname, lineno) -> [window start, records in window, records suppressed]
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get((record.pathname, record.lineno))
+            if site is None:
+                site = self.sites[(record.pathname, record.lineno)] = [now, 0, 0]
+            if now - site[0] >= self.window_seconds:
+                site[0], site[1] = now, 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def configure_logging(log_dir=None):
+    """Routes all logging through a background listener thread; returns the log file path.
+
+    Calling it again has no effect. The listener is stopped, flushing what is still queued,
+    when the interpreter exits.
+    """
+    global _listener
+    log_path = os.path.join(log_dir or os.getcwd(), LOG_FILE)
+    if _listener is not None:
+        return log_path
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=MAX_LOG_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8", delay=True)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(CONSOLE_LEVEL)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    level = os.environ.get("WORKTRACKER_LOG_LEVEL", LOG_LEVEL).upper()
+    root_logger.setLevel(level if isinstance(logging.getLevelName(level), int) else LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return log_path
@@ -1,24 +1,31 @@
 import tkinter as tk
 import datetime
 import time
-import sqlite3
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import logging
-import pystray
 import threading
 import queue
+import random
+import concurrent.futures
 import json # For parsing supabase config
 import uuid # For generating anonymous user IDs if needed before Supabase auth
 import webbrowser # New import for opening web links/email clients
 import urllib.parse # New import for URL encoding
 import sys
 
+# numpy, matplotlib, supabase and dateutil are imported where they are first needed, so the
+# timer window appears without waiting for them (see benchmarks/startup_time.py)
+import cloud
+import db_metrics
+import log_setup
+import timestamps
+from database import Database, default_db_path
+
 # --- ttkbootstrap Import ---
 try:
     import ttkbootstrap as ttk
     from ttkbootstrap.constants import *
+    from tkinter import filedialog
 except ImportError:
     print("ttkbootstrap not found. Please install it using 'pip install ttkbootstrap'")
     # Fallback to standard tkinter if ttkbootstrap is not available
@@ -26,42 +33,8 @@ except ImportError:
     from tkinter import ttk, messagebox, simpledialog, filedialog
 
 
-# --- Battery Optimization: Logging Config ---
-logging.basicConfig(
-    filename='work_tracker.log',
-    level=logging.WARNING,  # Set to INFO or DEBUG if needed
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
- # Import sys to get executable path
-
-# Import Supabase client
-try:
-    from supabase import create_client, Client
-    SUPABASE_AVAILABLE = True
-except ImportError:
-    logging.error("Supabase Python library not found. Cloud sync functionality will be disabled. Please install it using 'pip install supabase'.")
-    SUPABASE_AVAILABLE = False
-
-# Import dateutil for robust datetime parsing if available
-try:
-    from dateutil.parser import parse as date_parse
-    DATEUTIL_AVAILABLE = True
-except ImportError:
-    logging.warning("python-dateutil library not found. Datetime parsing for sync might be less robust. Install with 'pip install python-dateutil'.")
-    DATEUTIL_AVAILABLE = False
-
-
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-
-# Configure logging
-logging.basicConfig(filename='app.log', level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger().addHandler(console_handler)
+# All logging goes through one queue-backed, rotating, rate-limited pipeline (see log_setup)
+log_setup.configure_logging()
 
 # Check for Pillow (PIL) library availability for tray icon
 PIL_AVAILABLE = False
@@ -75,30 +48,59 @@ except ImportError:
 class WorkTracker:
     """A desktop application for tracking work sessions."""
 
+    # Number of sessions fetched per History page
+    HISTORY_PAGE_SIZE = 200
+    # Most queued DB commands run in one transaction by db_worker
+    DB_BATCH_LIMIT = 256
+    # Outbox retries back off exponentially from the base delay up to the maximum
+    OUTBOX_RETRY_BASE_SECONDS = 5
+    OUTBOX_RETRY_MAX_SECONDS = 900
+    # Most outbox entries uploaded in one pass
+    OUTBOX_BATCH_LIMIT = 500
+    # Stopwatch ticks land this long after each elapsed second, so timer jitter never shows the old second
+    STOPWATCH_TICK_SLACK_MS = 5
+    # Shortest interval between two tray icon images pushed to pystray
+    TRAY_MIN_UPDATE_SECONDS = 5
+    # How often an open Diagnostics window redraws its figures
+    DIAGNOSTICS_REFRESH_MS = 2000
+    # How often the Tk thread picks up callbacks handed over by worker threads
+    UI_POLL_MS = 50
+
     def __init__(self, root):
         """Initialises the WorkTracker Application."""
+        # Worker threads hand results to the Tk thread through this queue (see call_on_ui_thread)
+        self.ui_calls = queue.SimpleQueue()
+
         # Database setup - Queue for communication with DB thread
         self.db_queue = queue.Queue()
+        # Per-operation latency, queue wait and high-water marks, shown in Tools > Diagnostics
+        self.db_metrics = db_metrics.DbMetrics()
         self.db_thread = threading.Thread(target=self.db_worker, daemon=True)
         self.db_thread.start()
+        # Read-only queries run here, in parallel with the writes on db_thread
+        self.read_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=Database.READ_POOL_SIZE, thread_name_prefix="db-reader")
 
-        # Supabase setup for cloud sync
-        self.supabase_client = None
+        # Supabase setup for cloud sync; the client lives on its own network thread
+        self.cloud = cloud.CloudClient()
         self.supabase_user_id = None # Supabase user ID (from anonymous sign-in)
         self.display_name = None # User-set display name for leaderboard
 
-        # Define Lagos, Nigeria timezone (WAT, UTC+1)
-        self.lagos_timezone = datetime.timezone(datetime.timedelta(hours=1), 'WAT')
-
+        # Cloud writes are stored in the database outbox and uploaded by this thread
+        self.outbox_wakeup = threading.Event()
+        self.outbox_thread = threading.Thread(target=self.outbox_worker, daemon=True)
+        self.outbox_thread.start()
 
         # root window settings
         self.root = root
         self.root.title("Work Tracker")
         self.root.geometry("600x550")
+        self.root.after(self.UI_POLL_MS, self.poll_ui_calls)
 
         self.start_time = None
         self.is_running = False
         self.elapsed_time = 0
+        self.stopwatch_after_id = None # The one pending stopwatch tick, if any
         self.stopwatch_running = False
         self.is_paused = False
         self.pause_start_time = None
@@ -107,6 +109,9 @@ class WorkTracker:
         self.tray_icon = None
         self.base_tray_image = None
         self.last_tray_update_time = datetime.datetime.now()
+        self.tray_renderer = None
+        self.tray_text = None # Elapsed time shown by the tray icon, None while it shows base_tray_image
+        self.tray_after_id = None
         
         # --- Main Frame ---
         main_frame = ttk.Frame(root, padding="20")
@@ -135,12 +140,18 @@ class WorkTracker:
 
         self.end_time = None
         self.current_session_id = None
+        self.session_token = None
+        self.session_insert_future = None
         self.history_window = None
+        self.history_next_key = None
+        self.history_total_count = 0
+        self.history_generation = 0
         self.statistics_window = None
+        self.diagnostics_window = None
 
 
-        # Initialize local DB, then categories and Supabase
-        self.root.after(100, self.initial_setup)
+        # Initialize local DB, then categories and Supabase, once the window is built
+        self.root.after_idle(self.initial_setup)
 
         # --- Task Entry ---
         task_frame = ttk.Labelframe(main_frame, text="Current Task", padding=15)
@@ -177,38 +188,72 @@ class WorkTracker:
         tools_menu.add_command(label="View History", command=self.show_history)
         tools_menu.add_command(label="View Statistics", command=self.show_statistics)
         tools_menu.add_command(label="Co-work with Friends", command=self.show_co_work_dialog)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Diagnostics", command=self.show_diagnostics)
 
         self.menubar.add_command(label="Exit", command=self.exit_app)
 
         self.create_tray_icon()
         self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
+        # The stopwatch only ticks while the window is on screen
+        self.root.bind("<Map>", self.on_root_visibility_changed)
+        self.root.bind("<Unmap>", self.on_root_visibility_changed)
 
         logging.info("WorkTracker application initialized.")
 
     def initial_setup(self):
-        """Called after a short delay to ensure DB thread is ready and Supabase is initialized."""
-        user_home = os.path.expanduser("~")
-        app_dir = os.path.join(user_home, "WorkTracker")
-        if not os.path.exists(app_dir):
-            os.makedirs(app_dir)
-        db_path = os.path.join(app_dir, "deep_work.db")
-        self.db_queue.put(('INIT_DB', (db_path,), None, None))
-
-        # Initialize Supabase client
-        self.root.after(150, self._initialize_supabase_client) # Give DB thread a head start
-
-        # Schedule category dropdown update and then default category load and display name load
-        self.root.after(200, self.update_category_dropdown)
-        self.root.after(300, self.load_default_category_setting)
-        self.root.after(400, self.load_display_name_setting)
-        
-        # Schedule the first heartbeat and subsequent heartbeats
-        self.root.after(5000, self._schedule_heartbeat) # Initial call after 5 seconds
+        """Starts the local database, settings and cloud client as a pipeline of startup stages.
+
+        Each stage starts as soon as the stages it depends on report that they are done, so
+        local data and the network connection load side by side. Sessions can be started once
+        the local stages are ready, without waiting for the cloud.
+        """
+        db_path = default_db_path()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+
+        def init_database(done):
+            def on_database_ready(ready):
+                if ready:
+                    done()
+                else:
+                    ttk.dialogs.Messagebox.show_error("Could not open the local database. Check app.log for details.", "Database Error")
+            self.send_db_command_async('INIT_DB', (db_path,), callback=on_database_ready)
+
+        def init_cloud(done):
+            future = self._initialize_supabase_client()
+            if future:
+                future.add_done_callback(lambda connected: connected.exception() is None and done())
+
+        def enable_sessions(done):
+            self.start_button.config(state=tk.NORMAL)
+            done()
+
+        def start_heartbeat(done):
+            self._schedule_heartbeat() # Sends the first heartbeat now, then one every 30 seconds
+            done()
+
+        # Starting a session needs the categories, so it waits for the local stages
+        self.start_button.config(state=tk.DISABLED)
+
+        self.startup = StartupSequencer(self.call_on_ui_thread)
+        self.startup.add('database', init_database)
+        self.startup.add('cloud', init_cloud)
+        self.startup.add('categories', self.update_category_dropdown, after=('database',))
+        self.startup.add('default_category', self.load_default_category_setting, after=('categories',))
+        self.startup.add('display_name', self.load_display_name_setting, after=('database',))
+        self.startup.add('interactive', enable_sessions, after=('default_category', 'display_name'))
+        self.startup.add('heartbeat', start_heartbeat, after=('cloud', 'display_name'))
+        self.startup.start()
 
 
     def _initialize_supabase_client(self):
-        """Initializes Supabase client and signs in anonymously."""
-        if not SUPABASE_AVAILABLE:
+        """Initializes Supabase client and signs in anonymously.
+
+        Returns a Future for the connection made on the network thread, or None if the
+        client cannot be created.
+        """
+        if not cloud.SUPABASE_AVAILABLE:
             logging.warning("Supabase client not initialized: Library not available.")
             return
 
@@ -264,91 +309,254 @@ class WorkTracker:
             ttk.dialogs.Messagebox.show_warning("Invalid Supabase URL format. Please ensure SUPABASE_URL starts with 'https://'.", "Cloud Sync Error")
             return
         
-        try:
-            # create_client will raise SupabaseException if URL or Key is truly invalid
-            self.supabase_client: Client = create_client(supabase_url, supabase_key)
-            logging.info("Supabase client created successfully.")
-
-            # Ensure a local_unique_user_id exists for Supabase
-            local_unique_user_id = self.send_db_command('get_setting', ('local_unique_user_id',), expect_result=True)
-            if not local_unique_user_id:
-                local_unique_user_id = str(uuid.uuid4())
-                self.send_db_command('set_setting', ('local_unique_user_id', local_unique_user_id), expect_result=False)
-                logging.info(f"Generated new local_unique_user_id: {local_unique_user_id}")
-            
-            self.supabase_user_id = local_unique_user_id
-            logging.info(f"Supabase client initialized. Using local_unique_user_id: {self.supabase_user_id}")
-
+        # create_client will raise SupabaseException if URL or Key is truly invalid.
+        # The local_unique_user_id used with it is loaded (or generated) by load_display_name_setting
+        future = self.cloud.submit(self.cloud.connect, supabase_url, supabase_key)
+        self.call_on_ui_thread_when_done(future, self.on_supabase_connected)
+        return future
+
+    def on_supabase_connected(self, future):
+        """Reports the outcome of creating the Supabase client, once the network thread has tried."""
+        error = future.exception()
+        if error:
+            logging.error(f"Error initializing Supabase client: {error}", exc_info=error)
+            ttk.dialogs.Messagebox.show_warning(f"Failed to initialize Supabase for cloud sync: {error}. Leaderboard features will be unavailable.", "Cloud Sync Error")
+            return
+        # Upload whatever was left in the outbox by earlier runs
+        self.outbox_wakeup.set()
+
+    def queue_cloud_write(self, table_name, rows):
+        """Stores rows for a Supabase table in the outbox and wakes the upload thread.
+
+        Rows with the same key as a pending entry replace it, so only the newest version is sent.
+        Returns a Future that resolves to True once the rows are safely stored locally.
+        """
+        if isinstance(rows, dict):
+            rows = [rows]
+        entries = cloud.outbox_entries(table_name, rows)
+        future = self.send_db_command_async('enqueue_cloud_writes', (table_name, entries, time.time()))
+        future.add_done_callback(lambda done: done.result() and self.outbox_wakeup.set())
+        return future
+
+    def outbox_worker(self):
+        """Dedicated thread that schedules uploads of the cloud outbox.
+
+        Due entries are sent as one upsert per table on the network thread. Failed uploads are
+        retried with exponential backoff, so flaky connectivity delays cloud writes but never drops them.
+        """
+        wait_seconds = None
+        while True:
+            self.outbox_wakeup.wait(wait_seconds)
+            self.outbox_wakeup.clear()
+            if not self.cloud.connected:
+                wait_seconds = None # Woken again once the client exists
+                continue
+
+            now = time.time()
+            due_entries = self.send_db_command('get_due_cloud_writes', (now, self.OUTBOX_BATCH_LIMIT), expect_result=True) or []
+            entries_by_table = {}
+            for entry in due_entries:
+                entries_by_table.setdefault(entry[0], []).append(entry)
+
+            for table_name, entries in entries_by_table.items():
+                rows = [json.loads(entry[2]) for entry in entries]
+                # (table_name, row_key, enqueued_at) only matches entries that were not replaced meanwhile
+                entry_keys = [(entry[0], entry[1], entry[4]) for entry in entries]
+                if self.cloud.submit(self.cloud.upsert, table_name, rows).result():
+                    self.send_db_command('complete_cloud_writes', (entry_keys,))
+                else:
+                    # Jitter keeps many clients from retrying in lockstep after an outage; one factor
+                    # per upload keeps the entries of this batch due together
+                    jitter = random.uniform(0.5, 1.0)
+                    retries = []
+                    for entry_key, entry in zip(entry_keys, entries):
+                        delay = min(self.OUTBOX_RETRY_BASE_SECONDS * 2 ** entry[3], self.OUTBOX_RETRY_MAX_SECONDS)
+                        retries.append((now + delay * jitter,) + entry_key)
+                    self.send_db_command('reschedule_cloud_writes', (retries,))
+                    logging.warning(f"Upload of {len(rows)} outbox entries to '{table_name}' failed; retrying later.")
+
+            if len(due_entries) == self.OUTBOX_BATCH_LIMIT:
+                wait_seconds = 0
+                continue
+            next_attempt_at = self.send_db_command('get_next_cloud_write_time', expect_result=True)
+            wait_seconds = None if next_attempt_at is None else max(next_attempt_at - time.time(), 0)
 
-        except Exception as e:
-            logging.error(f"Error initializing Supabase client: {e}", exc_info=True)
-            ttk.dialogs.Messagebox.show_warning(f"Failed to initialize Supabase for cloud sync: {e}. Leaderboard features will be unavailable.", "Cloud Sync Error")
+    def db_worker(self):
+        """Dedicated thread for Database Operations.
 
-    def _send_supabase_data(self, table_name, data):
-        """Sends data to Supabase using the initialized client."""
-        if not self.supabase_client:
-            logging.warning("Cannot send data to Supabase: Client not initialized.")
-            return False
+        Whatever is already waiting on db_queue is drained as one batch and run inside a
+        single transaction, so a burst of writes costs one commit instead of one per write.
+        """
+        self.db = None
+        while True:
+            batch = [self.db_queue.get()]
+            while len(batch) < self.DB_BATCH_LIMIT:
+                try:
+                    batch.append(self.db_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.db_metrics.observe_batch(len(batch), self.db_queue.qsize())
+            try:
+                self.run_db_batch(batch)
+            finally:
+                for _ in batch:
+                    self.db_queue.task_done()
+
+    def run_db_batch(self, batch):
+        """Runs a batch of queued commands.
+
+        Writes are grouped into transactions on this thread. Reads go to the reader pool, after
+        the writes queued before them are committed so they always see those writes.
+        """
+        pending_writes = []
+        for command in batch:
+            if self.db and command[0] in Database.READ_OPERATIONS:
+                self.commit_db_writes(pending_writes)
+                pending_writes = []
+                self.db_metrics.read_submitted()
+                self.read_executor.submit(self.run_db_read, command)
+            else:
+                pending_writes.append(command)
+        self.commit_db_writes(pending_writes)
 
+    def commit_db_writes(self, commands):
+        """Runs write commands in one transaction and hands each result back once it is committed."""
+        if not commands:
+            return
+        results = []
         try:
-            # Use upsert to insert or update the record.
-            # Supabase identifies rows for upsert based on the primary key.
-            # For 'leaderboard_stats', the primary key is (user_id, stat_date).
-            response = self.supabase_client.table(table_name).upsert(data).execute()
-            
-            if response and response.data:
-                logging.info(f"Data successfully upserted to Supabase table '{table_name}': {response.data}")
-                return True
+            if self.db:
+                with self.db.batch():
+                    for command in commands:
+                        results.append(self.run_db_command(*command[:3], savepoint=True, enqueued_at=command[4]))
+                    commit_started = time.perf_counter()
+                self.db_metrics.record('COMMIT', None, time.perf_counter() - commit_started)
             else:
-                logging.error(f"Failed to upsert data to Supabase table '{table_name}': {response.status_code if response else 'No response'}")
-                return False
-
+                for command in commands:
+                    results.append(self.run_db_command(*command[:3], enqueued_at=command[4]))
         except Exception as e:
-            logging.error(f"Error sending data to Supabase table '{table_name}': {e}", exc_info=True)
-            return False
+            logging.error(f"Database batch of {len(commands)} operations failed to commit: {e}")
+            results = [None] * len(commands)
 
-    def db_worker(self):
-        """Dedicated thread for Database Operations."""
-        self.db = None
-        while True:
-            operation_type, args, kwargs, result_queue = self.db_queue.get()
-            try:
-                if operation_type == 'INIT_DB':
-                    db_path = args[0]
-                    self.db = Database(db_path)
-                    self.db.create_tables()
-                    logging.info(f"Database initialized at {db_path}")
-                elif self.db:
-                    if hasattr(self.db, operation_type):
-                        method = getattr(self.db, operation_type)
-                        result = method(*args, **kwargs)
-                        if result_queue:
-                            result_queue.put(result)
-                    else:
-                        logging.error(f"Unknown database operation: {operation_type}")
-                        if result_queue:
-                            result_queue.put(None)
-                else:
-                    logging.warning(f"Database not initialized. Skipping operation: {operation_type}")
-                    if result_queue:
-                        result_queue.put(None)
-            except Exception as e:
-                logging.error(f"Database operation '{operation_type}' failed: {e}")
-                if result_queue:
-                    result_queue.put(None)
-            finally:
-                self.db_queue.task_done()
+        results += [None] * (len(commands) - len(results))
+        for command, result in zip(commands, results):
+            self.deliver_db_result(command[3], result)
+
+    def run_db_read(self, command):
+        """Runs a read command on a reader-pool thread."""
+        try:
+            result = self.run_db_command(*command[:3], enqueued_at=command[4])
+        finally:
+            self.db_metrics.read_finished()
+        self.deliver_db_result(command[3], result)
+
+    def deliver_db_result(self, result_target, result):
+        """Hands a command result to whoever is waiting for it."""
+        if isinstance(result_target, concurrent.futures.Future):
+            result_target.set_result(result)
+        elif result_target:
+            result_target.put(result)
+
+    def run_db_command(self, operation_type, args, kwargs, savepoint=False, enqueued_at=None):
+        """Runs a single queued command, records its timings in db_metrics and returns its result.
+
+        With savepoint=True the command runs inside its own savepoint of the current batch.
+        enqueued_at is the perf_counter() time the command was queued, for its queue wait.
+        """
+        started = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = self._execute_db_command(operation_type, args, kwargs, savepoint)
+            failed = False
+        except Exception as e:
+            logging.error(f"Database operation '{operation_type}' failed: {e}")
+        finally:
+            self.db_metrics.record(
+                operation_type,
+                None if enqueued_at is None else started - enqueued_at,
+                time.perf_counter() - started,
+                db_metrics.result_rows(result),
+                failed
+            )
+        return result
+
+    def _execute_db_command(self, operation_type, args, kwargs, savepoint):
+        """Dispatches a command to the Database; exceptions propagate to run_db_command."""
+        if operation_type == 'INIT_DB':
+            db_path = args[0]
+            db = Database(db_path)
+            db.create_tables()
+            # Published only once its caches are loaded, since the Tk thread reads them directly
+            self.db = db
+            logging.info(f"Database initialized at {db_path}")
+            return self.db.conn is not None
+        if not self.db:
+            logging.warning(f"Database not initialized. Skipping operation: {operation_type}")
+            return None
+        if not hasattr(self.db, operation_type):
+            logging.error(f"Unknown database operation: {operation_type}")
+            return None
+        method = getattr(self.db, operation_type)
+        if savepoint:
+            with self.db.operation():
+                return method(*args, **kwargs)
+        return method(*args, **kwargs)
 
     def send_db_command(self, operation_name, args=(), kwargs=None, expect_result=False):
         """Helper to send commands to the DB thread and optionally wait for a result."""
         if kwargs is None:
             kwargs = {}
         result_queue = queue.Queue() if expect_result else None
-        self.db_queue.put((operation_name, args, kwargs, result_queue))
+        self.db_queue.put((operation_name, args, kwargs, result_queue, time.perf_counter()))
         if expect_result:
             return result_queue.get()
         return None
 
+    def send_db_command_async(self, operation_name, args=(), kwargs=None, callback=None):
+        """Queues a command for the DB thread without waiting and returns a Future for its result.
+
+        If a callback is given it is called with the result on the Tk thread, so it may touch widgets.
+        """
+        if kwargs is None:
+            kwargs = {}
+        future = concurrent.futures.Future()
+        if callback:
+            future.add_done_callback(lambda done: self.call_on_ui_thread(callback, done.result()))
+        self.db_queue.put((operation_name, args, kwargs, future, time.perf_counter()))
+        return future
+
+    def call_on_ui_thread(self, callback, *args):
+        """Schedules callback(*args) on the Tk main loop from any thread.
+
+        Worker threads must not call Tk themselves: with a threaded Tcl such a call waits for
+        the Tk thread, which may be waiting on that very worker. They only queue the callback,
+        and poll_ui_calls runs it.
+        """
+        self.ui_calls.put((callback, args))
+
+    def call_on_ui_thread_when_done(self, future, callback, *args):
+        """Calls callback(*args, future) on the Tk thread once future completes.
+
+        Futures of the network thread complete on that thread, so their results must reach
+        the UI through call_on_ui_thread rather than any Tk call of their own.
+        """
+        future.add_done_callback(lambda done: self.call_on_ui_thread(callback, *args, done))
+
+    def poll_ui_calls(self):
+        """Runs the callbacks queued by call_on_ui_thread; reschedules itself on the Tk thread."""
+        # Scheduled first, so callbacks keep arriving while one of them shows a modal dialog
+        self.root.after(self.UI_POLL_MS, self.poll_ui_calls)
+        while True:
+            try:
+                callback, args = self.ui_calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"UI callback {getattr(callback, '__name__', callback)} failed: {e}", exc_info=True)
+
     def create_tray_icon(self):
         """Creates a system tray icon with a default image."""
         self.tray_icon = None
@@ -359,13 +567,18 @@ class WorkTracker:
             return
 
         try:
+            # Imported here: on Linux pystray connects to the display as soon as it is imported
+            import pystray
+
             self.base_tray_image = Image.new("RGB", (16, 16), color=(255, 255, 255))
             draw = ImageDraw.Draw(self.base_tray_image)
             draw.text((2, 0), "W", fill=(0, 0, 0))
+            self.tray_renderer = TrayIconRenderer()
 
             menu = (
-                pystray.MenuItem("Open", self.show_window),
-                pystray.MenuItem("Exit", self.exit_app),
+                # Menu actions run on the tray thread, which must not call Tk itself
+                pystray.MenuItem("Open", lambda icon, item: self.call_on_ui_thread(self.show_window)),
+                pystray.MenuItem("Exit", lambda icon, item: self.call_on_ui_thread(self.exit_app)),
             )
 
             self.tray_icon = pystray.Icon(
@@ -379,22 +592,52 @@ class WorkTracker:
             self.tray_icon = None
             ttk.dialogs.Messagebox.show_warning("Failed to create system tray icon. An unexpected error occurred. Please ensure 'Pillow' library is correctly installed (pip install Pillow).", "Tray Icon Error")
 
-    def show_window(self, icon=None, item=None):
+    def show_window(self):
         """Shows the main window."""
         self.root.deiconify()
         if self.tray_icon and self.base_tray_image:
-            self.tray_icon.icon = self.base_tray_image
             self.tray_icon.visible = False
+        self.update_tray_icon()
 
     def hide_window(self):
         """Hides the main window and creates a tray icon."""
         self.root.withdraw()
         if self.tray_icon:
             self.tray_icon.visible = True
-            if self.base_tray_image:
+        self.update_tray_icon()
+
+    def update_tray_icon(self):
+        """Shows the elapsed session time in the tray icon while the window is hidden.
+
+        The next check is scheduled for when the displayed minute changes, and a new image is
+        only pushed to pystray when its text differs from the current one.
+        """
+        if self.tray_after_id is not None:
+            self.root.after_cancel(self.tray_after_id)
+            self.tray_after_id = None
+        if not self.tray_icon or not self.base_tray_image:
+            return
+
+        if not (self.tray_icon.visible and self.is_running and not self.is_paused and self.tray_renderer):
+            if self.tray_text is not None:
                 self.tray_icon.icon = self.base_tray_image
+                self.tray_text = None
+            return
 
-    def exit_app(self, icon=None, item=None):
+        elapsed_seconds = (datetime.datetime.now() - self.start_time).total_seconds()
+        text = self.tray_renderer.format_elapsed(elapsed_seconds)
+        delay_seconds = 60 - elapsed_seconds % 60
+        if text != self.tray_text:
+            since_last_update = (datetime.datetime.now() - self.last_tray_update_time).total_seconds()
+            if since_last_update >= self.TRAY_MIN_UPDATE_SECONDS:
+                self.tray_icon.icon = self.tray_renderer.render(text)
+                self.tray_text = text
+                self.last_tray_update_time = datetime.datetime.now()
+            else:
+                delay_seconds = self.TRAY_MIN_UPDATE_SECONDS - since_last_update
+        self.tray_after_id = self.root.after(int(delay_seconds * 1000) + self.STOPWATCH_TICK_SLACK_MS, self.update_tray_icon)
+
+    def exit_app(self):
         """Exits the application and stops any running session."""
         try:
             if self.is_running:
@@ -408,17 +651,26 @@ class WorkTracker:
             logging.error(f"Error exiting application: {e}")
 
     def get_available_categories(self, include_none=False): # Added include_none parameter
-        """Gets categories from db."""
-        all_categories = self.send_db_command('get_all_categories', expect_result=True)
-        if all_categories is None:
-            all_categories = []
+        """Gets categories from the Database's in-memory cache, without a DB thread round trip."""
+        # get_all_categories answers from memory once the database is initialized
+        all_categories = self.db.get_all_categories() if self.db else []
         if include_none:
             return ["None"] + all_categories
         return all_categories
 
-    def update_category_dropdown(self):
-        """Update the category dropdown with available categories."""
-        available_categories = self.get_available_categories()
+    def get_cached_setting(self, key):
+        """Gets a setting from the Database's in-memory cache, without a DB thread round trip."""
+        return self.db.get_setting(key) if self.db else None
+
+    def update_category_dropdown(self, on_loaded=None):
+        """Update the category dropdown with available categories, then call on_loaded()."""
+        self.apply_category_dropdown(self.get_available_categories())
+        if on_loaded:
+            on_loaded()
+
+    def apply_category_dropdown(self, available_categories):
+        """Fills the category dropdown once the categories have been loaded."""
+        available_categories = available_categories or []
         self.category_dropdown['values'] = available_categories
         if available_categories:
             if not self.category_var.get() or self.category_var.get() not in available_categories:
@@ -426,11 +678,14 @@ class WorkTracker:
         else:
             self.category_var.set("No Categories")
 
-    def load_default_category_setting(self):
-        """Loads the default category from settings and sets it in the dropdown."""
-        default_category = self.send_db_command('get_setting', ('default_category',), expect_result=True)
-        available_categories = self.get_available_categories()
+    def load_default_category_setting(self, on_loaded=None):
+        """Loads the default category from settings and sets it in the dropdown, then calls on_loaded()."""
+        self.apply_default_category(self.get_cached_setting('default_category'), self.get_available_categories())
+        if on_loaded:
+            on_loaded()
 
+    def apply_default_category(self, default_category, available_categories):
+        """Selects the default category in the dropdown, resetting it if it no longer exists."""
         if default_category and default_category in available_categories:
             self.category_var.set(default_category)
             logging.info(f"Default category '{default_category}' loaded and set.")
@@ -464,7 +719,7 @@ class WorkTracker:
 
         self.default_category_setting_var = tk.StringVar()
         
-        current_default = self.send_db_command('get_setting', ('default_category',), expect_result=True)
+        current_default = self.get_cached_setting('default_category')
         if current_default and current_default in category_options:
             self.default_category_setting_var.set(current_default)
         else:
@@ -493,20 +748,31 @@ class WorkTracker:
         
         value_to_save = None if selected_default == "None" else selected_default
 
-        success = self.send_db_command('set_setting', ('default_category', value_to_save), expect_result=True)
+        self.send_db_command_async(
+            'set_setting', ('default_category', value_to_save),
+            callback=lambda success: self.on_default_category_saved(dialog, success)
+        )
+
+    def on_default_category_saved(self, dialog, success):
         if success:
             ttk.dialogs.Messagebox.show_info("Default category setting updated.", "Settings Saved")
             self.load_default_category_setting()
-            dialog.destroy()
+            if dialog.winfo_exists():
+                dialog.destroy()
         else:
             ttk.dialogs.Messagebox.show_error("Failed to save default category setting.", "Error")
 
-    def load_display_name_setting(self):
-        """Loads the display name from settings and initializes Supabase user ID if not set."""
-        self.display_name = self.send_db_command('get_setting', ('display_name',), expect_result=True)
-        
+    def load_display_name_setting(self, on_loaded=None):
+        """Loads the display name from settings and initializes Supabase user ID if not set, then calls on_loaded()."""
+        self.apply_display_name_setting(self.get_cached_setting('display_name'), self.get_cached_setting('local_unique_user_id'))
+        if on_loaded:
+            on_loaded()
+
+    def apply_display_name_setting(self, display_name, local_user_id):
+        """Stores the loaded display name, generating the local Supabase user ID on first run."""
+        self.display_name = display_name
+
         # Ensure a local_unique_user_id exists for Supabase
-        local_user_id = self.send_db_command('get_setting', ('local_unique_user_id',), expect_result=True)
         if not local_user_id:
             local_user_id = str(uuid.uuid4())
             self.send_db_command('set_setting', ('local_unique_user_id', local_user_id), expect_result=False)
@@ -554,18 +820,24 @@ class WorkTracker:
             ttk.dialogs.Messagebox.show_warning("Display name cannot be empty.", "Input Error")
             return
 
-        success = self.send_db_command('set_setting', ('display_name', new_display_name), expect_result=True)
+        self.send_db_command_async(
+            'set_setting', ('display_name', new_display_name),
+            callback=lambda success: self.on_display_name_saved(dialog, new_display_name, success)
+        )
+
+    def on_display_name_saved(self, dialog, new_display_name, success):
         if success:
             self.display_name = new_display_name
             ttk.dialogs.Messagebox.show_info("Display name updated.", "Settings Saved")
-            dialog.destroy()
+            if dialog.winfo_exists():
+                dialog.destroy()
         else:
             ttk.dialogs.Messagebox.show_error("Failed to save display name.", "Error")
 
     def _schedule_heartbeat(self):
         """Sends a heartbeat to the cloud and reschedules itself."""
         # Ensure Supabase client is ready and user_id is available before sending heartbeats
-        if self.supabase_client and self.supabase_user_id and self.display_name:
+        if self.cloud.connected and self.supabase_user_id and self.display_name:
             self.send_heartbeat_to_cloud()
         else:
             logging.warning("Supabase client or user ID not ready for heartbeat. Skipping this cycle.")
@@ -575,9 +847,9 @@ class WorkTracker:
 
     def send_heartbeat_to_cloud(self):
         """Sends a heartbeat to the Supabase online_status table."""
-        if not SUPABASE_AVAILABLE or not self.supabase_client or not self.supabase_user_id or not self.display_name:
+        if not cloud.SUPABASE_AVAILABLE or not self.cloud.connected or not self.supabase_user_id or not self.display_name:
             logging.warning("Cannot send heartbeat: Supabase not initialized or display name missing.")
-            return False
+            return
 
         current_utc_time = datetime.datetime.now(datetime.timezone.utc)
         heartbeat_data = {
@@ -586,21 +858,21 @@ class WorkTracker:
             'last_active_at': current_utc_time.isoformat()
         }
 
-        logging.info(f"Sending heartbeat: {heartbeat_data}")
-        success = self._send_supabase_data('online_status', heartbeat_data)
+        def on_heartbeat_queued(done):
+            if done.result():
+                logging.debug("Heartbeat queued for the cloud.")
+            else:
+                logging.error("Failed to queue heartbeat for the cloud.")
 
-        if success:
-            logging.info("Heartbeat sent to cloud successfully.")
-        else:
-            logging.error("Failed to send heartbeat to cloud.")
-        return success
+        # The outbox thread does the upload, so the Tk loop never waits on the network
+        self.queue_cloud_write('online_status', heartbeat_data).add_done_callback(on_heartbeat_queued)
 
     def sync_daily_stats_to_cloud(self):
         """Calculates daily stats and uploads them to Supabase."""
-        if not SUPABASE_AVAILABLE:
+        if not cloud.SUPABASE_AVAILABLE:
             ttk.dialogs.Messagebox.show_warning("Supabase library not available. Cannot sync stats.", "Cloud Sync")
             return
-        if not self.supabase_client:
+        if not self.cloud.connected:
             ttk.dialogs.Messagebox.show_warning("Supabase client not initialized. Check logs for API key errors.", "Cloud Sync")
             return
         if not self.supabase_user_id:
@@ -620,117 +892,42 @@ class WorkTracker:
             else:
                 pass # User chose to proceed with generic ID
 
-        # --- Define 'today' based on Lagos, Nigeria timezone (WAT, UTC+1) ---
-        lagos_tz = datetime.timezone(datetime.timedelta(hours=1), 'WAT')
-        now_in_lagos = datetime.datetime.now(lagos_tz)
-        today_in_lagos = now_in_lagos.date()
-
-        start_of_today_in_lagos = datetime.datetime(today_in_lagos.year, today_in_lagos.month, today_in_lagos.day, 0, 0, 0, 0, tzinfo=lagos_tz)
-        end_of_today_in_lagos = datetime.datetime(today_in_lagos.year, today_in_lagos.month, today_in_lagos.day, 23, 59, 59, 999999, tzinfo=lagos_tz)
-
-        # Convert to UTC for querying SQLite (if SQLite stores naive times, this might need adjustment)
-        # Assuming SQLite stores naive times as local times, we query based on local times.
-        # The conversion to UTC happens when saving to SQLite and sending to Supabase.
-        
-        # Get all sessions for today (based on Lagos time)
-        # Note: get_filtered_sessions expects naive datetimes if SQLite is naive, or timezone-aware if SQLite is timezone-aware.
-        # Since we're storing UTC in SQLite, we should query with UTC datetimes for consistency.
-        start_of_today_utc = start_of_today_in_lagos.astimezone(datetime.timezone.utc)
-        end_of_today_utc = end_of_today_in_lagos.astimezone(datetime.timezone.utc)
+        # Only the Lagos calendar dates whose sessions changed since the last sync are uploaded
+        self.send_db_command_async('get_unsynced_stat_dates', callback=self.on_unsynced_stat_dates)
 
-
-        today_sessions = self.send_db_command(
-            'get_filtered_sessions',
-            (start_of_today_utc, end_of_today_utc, "All", None), # Filter by date, ignore category/search
-            expect_result=True
-        )
-
-        if not today_sessions:
-            ttk.dialogs.Messagebox.show_info("No sessions recorded today to sync.", "Cloud Sync")
+    def on_unsynced_stat_dates(self, unsynced_dates):
+        """Loads the sessions of the changed stat dates so their totals can be recalculated."""
+        if not unsynced_dates:
+            ttk.dialogs.Messagebox.show_info("Your cloud statistics are already up to date.", "Cloud Sync")
             return
 
-        # --- Calculate total duration for the day ---
-        total_duration_today_minutes = 0.0
-        longest_session_duration_minutes = 0.0
-
-        for session in today_sessions:
-            # session: (id, start_time_str, end_time_str, category, notes)
-            try:
-                # Parse stored UTC strings back to datetime objects
-                if DATEUTIL_AVAILABLE:
-                    start_dt = date_parse(session[1])
-                    end_dt = date_parse(session[2]) if session[2] else None
-                else:
-                    # Fallback to trying multiple specific formats
-                    parsed_start = False
-                    for fmt in ['%Y-%m-%d %H:%M:%S.%f%z', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ']: # Added ISO formats
-                        try:
-                            # Handle potential timezone info in string
-                            if 'Z' in session[1] or '+' in session[1] or '-' == session[1][-3] or '-' == session[1][-6]: # Basic check for timezone info
-                                start_dt = datetime.datetime.fromisoformat(session[1])
-                            else:
-                                start_dt = datetime.datetime.strptime(session[1], fmt)
-                            # Ensure it's timezone-aware UTC if it was naive
-                            if start_dt.tzinfo is None:
-                                start_dt = start_dt.replace(tzinfo=datetime.timezone.utc)
-                            parsed_start = True
-                            break
-                        except ValueError:
-                            continue
-                    if not parsed_start:
-                        logging.error(f"Could not parse start_time: {session[1]}")
-                        continue # Skip this session
-
-                    parsed_end = False
-                    if session[2]:
-                        for fmt in ['%Y-%m-%d %H:%M:%S.%f%z', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ']: # Added ISO formats
-                            try:
-                                if 'Z' in session[2] or '+' in session[2] or '-' == session[2][-3] or '-' == session[2][-6]:
-                                    end_dt = datetime.datetime.fromisoformat(session[2])
-                                else:
-                                    end_dt = datetime.datetime.strptime(session[2], fmt)
-                                if end_dt.tzinfo is None:
-                                    end_dt = end_dt.replace(tzinfo=datetime.timezone.utc)
-                                parsed_end = True
-                                break
-                            except ValueError:
-                                continue
-                    else:
-                        end_dt = None # Handle ongoing sessions
-                        parsed_end = True # Mark as parsed if no end_time
-
-                    if not parsed_end:
-                        logging.error(f"Could not parse end_time: {session[2]}")
-                        continue # Skip this session
-
-                # Ensure end_time exists for duration calculation
-                if end_dt:
-                    duration = (end_dt - start_dt).total_seconds() / 60 # in minutes
-                    total_duration_today_minutes += duration # Accumulate total duration
-                    if duration > longest_session_duration_minutes:
-                        longest_session_duration_minutes = duration
-            except Exception as e: # Catch any other parsing or calculation errors
-                logging.error(f"Error processing session for sync (ID: {session[0]}): {e}", exc_info=True)
-                continue # Skip malformed or incomplete session
-
-        daily_stats_data = {
-            'user_id': self.supabase_user_id, # Use the consistent local Supabase user ID
-            'display_name': self.display_name,
-            'stat_date': today_in_lagos.isoformat(), # Use Lagos's calendar date
-            'total_duration_minutes': round(total_duration_today_minutes, 2), # New field for total duration
-            'longest_session_duration_minutes': round(longest_session_duration_minutes, 2),
-            'last_synced': datetime.datetime.now(datetime.timezone.utc).isoformat() # Always sync 'last_synced' in UTC
-        }
+        self.send_db_command_async(
+            'get_session_epochs_in_ranges', (cloud.stat_date_ranges([stat_date for stat_date, _ in unsynced_dates]),),
+            callback=lambda session_epochs: self.queue_daily_stats(unsynced_dates, session_epochs or [])
+        )
 
-        # Send data to Supabase leaderboard_stats table
-        success = self._send_supabase_data('leaderboard_stats', daily_stats_data)
+    def queue_daily_stats(self, unsynced_dates, session_epochs):
+        """Recalculates the changed stat dates and queues them for upload."""
+        last_synced = datetime.datetime.now(datetime.timezone.utc).isoformat() # Always sync 'last_synced' in UTC
+        daily_stats_rows = cloud.leaderboard_rows(
+            self.supabase_user_id, self.display_name,
+            [stat_date for stat_date, _ in unsynced_dates], session_epochs, last_synced
+        )
 
-        if success:
-            ttk.dialogs.Messagebox.show_info("Daily statistics synced to cloud successfully!", "Cloud Sync")
-            logging.info(f"Synced daily stats for {self.display_name}: {daily_stats_data}")
+        # The outbox uploads every changed day to leaderboard_stats in one batched upsert
+        future = self.queue_cloud_write('leaderboard_stats', daily_stats_rows)
+        self.call_on_ui_thread_when_done(future, self.on_daily_stats_queued, unsynced_dates, daily_stats_rows)
+
+    def on_daily_stats_queued(self, unsynced_dates, daily_stats_rows, future):
+        """Clears the queued stat dates and tells the user the sync is under way."""
+        if future.result():
+            # Dates edited again since they were read stay marked for the next sync
+            self.send_db_command('mark_stat_dates_synced', (unsynced_dates,))
+            ttk.dialogs.Messagebox.show_info(f"Statistics for {len(daily_stats_rows)} day(s) are being synced to the cloud. Anything that cannot be sent now is retried automatically.", "Cloud Sync")
+            logging.info(f"Queued daily stats for {self.display_name} on {len(daily_stats_rows)} day(s): {[row['stat_date'] for row in daily_stats_rows]}")
         else:
             ttk.dialogs.Messagebox.show_error("Failed to sync daily statistics to cloud. Check app.log.", "Cloud Sync Error")
-            logging.error(f"Failed to sync daily stats for {self.display_name}")
+            logging.error(f"Failed to queue daily stats for {self.display_name}")
 
 
     def on_category_select(self, event):
@@ -744,17 +941,22 @@ class WorkTracker:
             new_category = ttk.dialogs.dialogs.askstring("Add Category", "Enter new category name:")
             if new_category and new_category.strip():
                 new_category = new_category.strip()
-                success = self.send_db_command('insert_category', (new_category,), expect_result=True)
-                if success:
-                    self.update_category_dropdown()
-                    self.category_var.set(new_category)
-                    ttk.dialogs.Messagebox.show_info(f"Category '{new_category}' added.", "Success")
-                else:
-                    ttk.dialogs.Messagebox.show_error(f"Failed to add category '{new_category}'. It might already exist.", "Error")
+                self.send_db_command_async(
+                    'insert_category', (new_category,),
+                    callback=lambda success: self.on_category_added(new_category, success)
+                )
         except Exception as e:
             logging.error(f"Error adding category: {e}")
             ttk.dialogs.Messagebox.show_error(f"An error occurred while adding category: {e}", "Error")
 
+    def on_category_added(self, new_category, success):
+        if success:
+            self.update_category_dropdown()
+            self.category_var.set(new_category)
+            ttk.dialogs.Messagebox.show_info(f"Category '{new_category}' added.", "Success")
+        else:
+            ttk.dialogs.Messagebox.show_error(f"Failed to add category '{new_category}'. It might already exist.", "Error")
+
     def delete_category(self):
         """Deletes the currently selected category from the database."""
         try:
@@ -765,17 +967,22 @@ class WorkTracker:
 
             response = ttk.dialogs.Messagebox.show_question(f"Are you sure you want to permanently delete category '{selected_category}'?\n\nAll existing sessions with this category will be set to 'Uncategorized'.", "Confirm Delete", buttons=["Yes", "No"])
             if response == "Yes":
-                success = self.send_db_command('delete_category_from_db', (selected_category,), expect_result=True)
-                if success:
-                    self.update_category_dropdown()
-                    ttk.dialogs.Messagebox.show_info(f"Category '{selected_category}' and its associated sessions updated to 'Uncategorized'.", "Category Deleted")
-                    self.load_default_category_setting()
-                else:
-                    ttk.dialogs.Messagebox.show_error(f"Failed to delete category '{selected_category}'.", "Error")
+                self.send_db_command_async(
+                    'delete_category_from_db', (selected_category,),
+                    callback=lambda success: self.on_category_deleted(selected_category, success)
+                )
         except Exception as e:
             logging.error(f"Error deleting category: {e}")
             ttk.dialogs.Messagebox.show_error(f"An error occurred while deleting category: {e}", "Error")
 
+    def on_category_deleted(self, selected_category, success):
+        if success:
+            self.update_category_dropdown()
+            ttk.dialogs.Messagebox.show_info(f"Category '{selected_category}' and its associated sessions updated to 'Uncategorized'.", "Category Deleted")
+            self.load_default_category_setting()
+        else:
+            ttk.dialogs.Messagebox.show_error(f"Failed to delete category '{selected_category}'.", "Error")
+
     def rename_category(self):
         """Renames the currently selected category in the database."""
         try:
@@ -792,18 +999,23 @@ class WorkTracker:
                     ttk.dialogs.Messagebox.show_info("Old and new category names are the same. No change made.", "Rename Category")
                     return
 
-                success = self.send_db_command('rename_category', (old_category, new_category), expect_result=True)
-                if success:
-                    self.update_category_dropdown()
-                    self.category_var.set(new_category)
-                    self.load_default_category_setting()
-                    ttk.dialogs.Messagebox.show_info(f"Category '{old_category}' renamed to '{new_category}'.", "Rename Category")
-                else:
-                    ttk.dialogs.Messagebox.show_error(f"Failed to rename category '{old_category}'. New name might already exist.", "Error")
+                self.send_db_command_async(
+                    'rename_category', (old_category, new_category),
+                    callback=lambda success: self.on_category_renamed(old_category, new_category, success)
+                )
         except Exception as e:
             logging.error(f"Error renaming category: {e}")
             ttk.dialogs.Messagebox.show_error(f"An error occurred while renaming category: {e}", "Error")
 
+    def on_category_renamed(self, old_category, new_category, success):
+        if success:
+            self.update_category_dropdown()
+            self.category_var.set(new_category)
+            self.load_default_category_setting()
+            ttk.dialogs.Messagebox.show_info(f"Category '{old_category}' renamed to '{new_category}'.", "Rename Category")
+        else:
+            ttk.dialogs.Messagebox.show_error(f"Failed to rename category '{old_category}'. New name might already exist.", "Error")
+
     def show_co_work_dialog(self):
         """Opens a dialog to show online users and invite them for co-work."""
         co_work_dialog = ttk.Toplevel(title="Co-work with Friends")
@@ -835,59 +1047,40 @@ class WorkTracker:
         co_work_dialog.wait_window()
 
     def _populate_online_users(self):
-        """Fetches online users from Supabase and populates the Treeview."""
+        """Fetches online users from Supabase on the network thread and populates the Treeview."""
         for item in self.online_users_tree.get_children():
             self.online_users_tree.delete(item)
 
-        if not SUPABASE_AVAILABLE or not self.supabase_client:
+        if not cloud.SUPABASE_AVAILABLE or not self.cloud.connected:
             logging.warning("Supabase not available for fetching online users.")
             self.online_users_tree.insert("", "end", values=("Cloud sync not active.",))
             return
 
-        try:
-            # Define online threshold (e.g., last 60 seconds)
-            online_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=60)
-            
-            # Fetch online status from Supabase
-            # Note: supabase-py doesn't directly support client-side filtering by timestamp in select()
-            # We'll fetch all and filter client-side for simplicity, or implement RPC for server-side filter.
-            # For small number of users, fetching all is fine.
-            response = self.supabase_client.table('online_status').select('*').execute()
-
-            if response and response.data:
-                online_users = []
-                for user_data in response.data:
-                    last_active_str = user_data.get('last_active_at')
-                    user_id = user_data.get('user_id')
-                    display_name = user_data.get('display_name')
-
-                    if last_active_str and user_id and display_name:
-                        try:
-                            # Parse last_active_at to a timezone-aware datetime object
-                            last_active_dt = date_parse(last_active_str) if DATEUTIL_AVAILABLE else datetime.datetime.fromisoformat(last_active_str.replace('Z', '+00:00'))
-                            
-                            # Ensure it's UTC for comparison
-                            if last_active_dt.tzinfo is None:
-                                last_active_dt = last_active_dt.replace(tzinfo=datetime.timezone.utc)
-
-                            # Check if active and not current user
-                            if last_active_dt >= online_threshold and user_id != self.supabase_user_id:
-                                online_users.append({'display_name': display_name, 'user_id': user_id})
-                        except Exception as e:
-                            logging.error(f"Error parsing last_active_at for user {display_name}: {e}", exc_info=True)
-                            continue # Skip this user if parsing fails
-
-                if online_users:
-                    for user in online_users:
-                        self.online_users_tree.insert("", "end", values=(user['display_name'],))
-                else:
-                    self.online_users_tree.insert("", "end", values=("No friends online right now.",))
-            else:
-                self.online_users_tree.insert("", "end", values=("Could not fetch online status.",))
+        self.online_users_tree.insert("", "end", values=("Loading...",))
+        future = self.cloud.submit(self.cloud.fetch_online_users, self.supabase_user_id)
+        self.call_on_ui_thread_when_done(future, self._show_online_users)
 
-        except Exception as e:
-            logging.error(f"Error fetching online users from Supabase: {e}", exc_info=True)
+    def _show_online_users(self, future):
+        """Fills the co-work Treeview with the result of CloudClient.fetch_online_users."""
+        if not self.online_users_tree.winfo_exists():
+            return # The co-work dialog was closed while the request was in flight
+        for item in self.online_users_tree.get_children():
+            self.online_users_tree.delete(item)
+
+        error = future.exception()
+        if error:
+            logging.error(f"Error fetching online users from Supabase: {error}", exc_info=error)
             self.online_users_tree.insert("", "end", values=("Error fetching online users.",))
+            return
+
+        online_users = future.result()
+        if online_users is None:
+            self.online_users_tree.insert("", "end", values=("Could not fetch online status.",))
+        elif online_users:
+            for user in online_users:
+                self.online_users_tree.insert("", "end", values=(user['display_name'],))
+        else:
+            self.online_users_tree.insert("", "end", values=("No friends online right now.",))
 
     def _invite_selected_user(self):
         """Invites the selected user for co-work via email."""
@@ -924,21 +1117,112 @@ class WorkTracker:
             logging.error(f"Failed to open email client: {e}", exc_info=True)
             ttk.dialogs.Messagebox.show_error("Could not open email client. Please try manually.", "Error")
 
+    def show_diagnostics(self):
+        """Opens a window with the latency and queue statistics of the database commands."""
+        if self.diagnostics_window and tk.Toplevel.winfo_exists(self.diagnostics_window):
+            self.diagnostics_window.lift()
+            return
+
+        self.diagnostics_window = ttk.Toplevel(title="Diagnostics")
+        self.diagnostics_window.geometry("900x450")
+
+        frame = ttk.Frame(self.diagnostics_window, padding=10)
+        frame.pack(fill=BOTH, expand=True)
+
+        summary_label = ttk.Label(frame, text="", bootstyle="info")
+        summary_label.pack(fill=X, pady=(0, 10))
+
+        columns = ("Operation", "Count", "Errors", "Rows", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Wait p95 ms", "Wait max ms")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", bootstyle="primary")
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=170 if column == "Operation" else 75, anchor=tk.W if column == "Operation" else tk.E)
+        tree.pack(fill=BOTH, expand=True)
+
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(pady=10)
+
+        def refresh():
+            """Redraws the table from a fresh snapshot, then again every DIAGNOSTICS_REFRESH_MS while open."""
+            if not self.diagnostics_window or not self.diagnostics_window.winfo_exists():
+                return
+            snapshot = self.db_metrics.snapshot()
+            summary_label.config(text=(
+                f"Since {snapshot['since'][:19].replace('T', ' ')} UTC  |  "
+                f"Queue depth high-water: {snapshot['queue_depth_high_water']}  |  "
+                f"Largest batch: {snapshot['batch_size_high_water']}  |  "
+                f"Reads in flight: {snapshot['reads_in_flight']} (high-water {snapshot['reads_in_flight_high_water']})"
+            ))
+            tree.delete(*tree.get_children())
+            for entry in snapshot['operations']:
+                exec_ms = entry['exec_ms']
+                wait_ms = entry['wait_ms'] or {}
+                tree.insert("", "end", values=(
+                    entry['operation'], entry['count'], entry['errors'], entry['rows'],
+                    f"{exec_ms['p50']:.1f}", f"{exec_ms['p95']:.1f}", f"{exec_ms['p99']:.1f}", f"{exec_ms['max']:.1f}",
+                    f"{wait_ms['p95']:.1f}" if wait_ms else "-", f"{wait_ms['max']:.1f}" if wait_ms else "-",
+                ))
+            self.diagnostics_window.after(self.DIAGNOSTICS_REFRESH_MS, refresh)
+
+        def reset():
+            self.db_metrics.reset()
+            refresh()
+
+        def save_json():
+            file_path = filedialog.asksaveasfilename(
+                parent=self.diagnostics_window,
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                title="Save Diagnostics As"
+            )
+            if not file_path:
+                return
+            try:
+                self.db_metrics.dump_json(file_path)
+                logging.info(f"Database diagnostics written to {file_path}")
+            except OSError as e:
+                logging.error(f"Error writing diagnostics to {file_path}: {e}")
+                ttk.dialogs.Messagebox.show_error(f"Could not save diagnostics: {e}", "Diagnostics")
+
+        ttk.Button(button_frame, text="Reset", command=reset, bootstyle="warning-outline").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save as JSON...", command=save_json, bootstyle="primary-outline").pack(side=tk.LEFT, padx=5)
+
+        refresh()
 
     def update_stopwatch(self):
-        """Update the stopwatch display."""
-        if self.stopwatch_running and not self.is_paused:
-            current_time = datetime.datetime.now()
-            elapsed = current_time - self.start_time
-            self.elapsed_time = elapsed.total_seconds()
-
-            if self.root.winfo_ismapped():
-                # Round elapsed time to the nearest second for display
-                rounded_elapsed_time = round(self.elapsed_time)
-                formatted_time = time.strftime("%H:%M:%S", time.gmtime(rounded_elapsed_time))
-                self.stopwatch_label.config(text=formatted_time)
-        
-        self.root.after(50, self.update_stopwatch) # Update more frequently for smoother feel, though display is per second
+        """Updates the stopwatch display and schedules the next tick.
+
+        This is the only place the stopwatch timer is armed, so calling it again never stacks
+        timers. Each tick is aligned to the next whole elapsed second, and no tick is scheduled
+        while no session is running, while it is paused, or while the window is hidden.
+        """
+        self.cancel_stopwatch_tick()
+        if not self.stopwatch_running or self.is_paused:
+            return
+
+        elapsed = datetime.datetime.now() - self.start_time
+        self.elapsed_time = elapsed.total_seconds()
+        if not self.root.winfo_ismapped():
+            return # on_root_visibility_changed restarts the ticks once the window is shown
+
+        formatted_time = time.strftime("%H:%M:%S", time.gmtime(int(self.elapsed_time)))
+        self.stopwatch_label.config(text=formatted_time)
+
+        # Computing the delay from the clock each time keeps the display from drifting
+        delay_ms = 1000 - int((self.elapsed_time % 1) * 1000) + self.STOPWATCH_TICK_SLACK_MS
+        self.stopwatch_after_id = self.root.after(delay_ms, self.update_stopwatch)
+
+    def cancel_stopwatch_tick(self):
+        """Cancels the pending stopwatch tick, if there is one."""
+        if self.stopwatch_after_id is not None:
+            self.root.after_cancel(self.stopwatch_after_id)
+            self.stopwatch_after_id = None
+
+    def on_root_visibility_changed(self, event):
+        """Starts or stops the stopwatch ticks as the main window is shown, hidden or minimized."""
+        # Bindings on the root window also fire for its children
+        if event.widget is self.root:
+            self.update_stopwatch()
 
     def toggle_pause_resume(self):
         """Toggles the session between paused and resumed states."""
@@ -946,13 +1230,13 @@ class WorkTracker:
             if not self.is_paused:
                 self.is_paused = True
                 self.stopwatch_running = False
+                self.cancel_stopwatch_tick()
                 self.pause_start_time = datetime.datetime.now()
                 self.pause_button.config(text="Resume")
                 self.start_button.config(state=tk.DISABLED)
                 self.stop_button.config(state=tk.NORMAL)
                 
-                if self.tray_icon and self.base_tray_image:
-                    self.tray_icon.icon = self.base_tray_image
+                self.update_tray_icon()
                 
                 logging.info("Session paused.")
             else:
@@ -992,21 +1276,14 @@ class WorkTracker:
             task = self.task_text.get("1.0", tk.END).strip()
             logging.info(f"Attempting to start session with category: {category}, task: {task}")
 
-            self.current_session_id = self.send_db_command(
-                'insert_session', (self.start_time, None, category, task), expect_result=True)
-
-            if self.current_session_id is None:
-                logging.error("Failed to get session ID from database. Database insertion likely failed.")
-                ttk.dialogs.Messagebox.show_error("Failed to start session. Database error. Check app.log for details.", "Error")
-                self.stopwatch_running = False
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                logging.info("Buttons state reverted due to DB error: Start=NORMAL, Pause=DISABLED, Stop=DISABLED")
-                return
-
-            logging.info(f"Session started successfully with category: {category}, ID: {self.current_session_id}")
+            # The insert runs in the background; the session ID arrives in on_session_inserted
+            self.current_session_id = None
+            session_token = object()
+            self.session_token = session_token
+            self.session_insert_future = self.send_db_command_async(
+                'insert_session', (self.start_time, None, category, task),
+                callback=lambda session_id: self.on_session_inserted(session_token, session_id, category)
+            )
         except Exception as e:
             logging.error(f"Error starting session: {e}", exc_info=True)
             ttk.dialogs.Messagebox.show_error(f"An unexpected error occurred while starting the session: {e}. Check app.log for details.", "Error")
@@ -1017,8 +1294,32 @@ class WorkTracker:
             self.stop_button.config(state=tk.DISABLED)
             logging.info("Buttons state reverted due to unexpected error: Start=NORMAL, Pause=DISABLED, Stop=DISABLED")
 
+    def on_session_inserted(self, session_token, session_id, category):
+        """Receives the ID of a newly inserted session, or reverts the UI if the insert failed."""
+        if session_token is not self.session_token or self.current_session_id is not None:
+            # The session was already stopped (stop_session waited for the ID itself)
+            return
+
+        if session_id is None:
+            logging.error("Failed to get session ID from database. Database insertion likely failed.")
+            ttk.dialogs.Messagebox.show_error("Failed to start session. Database error. Check app.log for details.", "Error")
+            self.stopwatch_running = False
+            self.is_running = False
+            self.start_button.config(state=tk.NORMAL)
+            self.pause_button.config(state=tk.DISABLED)
+            self.stop_button.config(state=tk.DISABLED)
+            logging.info("Buttons state reverted due to DB error: Start=NORMAL, Pause=DISABLED, Stop=DISABLED")
+            return
+
+        self.current_session_id = session_id
+        logging.info(f"Session started successfully with category: {category}, ID: {self.current_session_id}")
+
     def stop_session(self):
         try:
+            if self.current_session_id is None and self.is_running and self.session_insert_future:
+                # Stopped before the insert result reached the UI; it is already queued, so wait for it
+                self.current_session_id = self.session_insert_future.result()
+
             if self.current_session_id is None:
                 logging.warning("Attempted to stop session when no session was running.")
                 return
@@ -1031,6 +1332,7 @@ class WorkTracker:
             self.pause_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.DISABLED)
             self.stopwatch_running = False
+            self.cancel_stopwatch_tick()
             task = self.task_text.get("1.0", tk.END).strip()
 
             self.send_db_command(
@@ -1039,10 +1341,12 @@ class WorkTracker:
             self.task_text.delete("1.0", tk.END)
             self.display_session_duration()
             self.current_session_id = None
+            # A late insert callback must not revive or revert the session that was just stopped
+            self.session_token = None
+            self.session_insert_future = None
             logging.info("Session stopped")
 
-            if self.tray_icon and self.base_tray_image:
-                self.tray_icon.icon = self.base_tray_image
+            self.update_tray_icon()
 
         except Exception as e:
             logging.error(f"Error stopping session: {e}")
@@ -1081,9 +1385,9 @@ class WorkTracker:
         ttk.Label(filter_frame, text="Category:").grid(row=0, column=2, padx=5, pady=2, sticky="w")
         self.history_category_var = tk.StringVar(self.history_window)
         self.history_category_var.set("All")
-        all_categories_for_filter = ["All"] + self.send_db_command('get_all_categories', expect_result=True) + ["Uncategorized"]
         self.history_category_dropdown = ttk.Combobox(
-            filter_frame, textvariable=self.history_category_var, values=all_categories_for_filter, state="readonly"
+            filter_frame, textvariable=self.history_category_var,
+            values=["All"] + self.get_available_categories() + ["Uncategorized"], state="readonly"
         )
         self.history_category_dropdown.grid(row=0, column=3, padx=5, pady=2, sticky="ew")
 
@@ -1119,10 +1423,17 @@ class WorkTracker:
         self.history_tree.column("Category", width=100, stretch=tk.NO)
         self.history_tree.column("Notes", stretch=tk.YES)
 
-        self.history_tree.pack(expand=True, fill="both", padx=10, pady=10)
-
         history_action_frame = ttk.Frame(self.history_window, padding=5)
-        history_action_frame.pack(fill="x", pady=5)
+        history_action_frame.pack(side=tk.BOTTOM, fill="x", pady=5)
+
+        # Pages are fetched lazily as the scrollbar approaches the end of the loaded rows
+        self.history_scrollbar = ttk.Scrollbar(self.history_window, orient=tk.VERTICAL, command=self.history_tree.yview)
+        self.history_scrollbar.pack(side=tk.RIGHT, fill="y", padx=(0, 10), pady=10)
+        self.history_tree.configure(yscrollcommand=self.on_history_scroll)
+        self.history_tree.pack(expand=True, fill="both", padx=(10, 0), pady=10)
+
+        self.history_count_label = ttk.Label(history_action_frame, text="", bootstyle="secondary")
+        self.history_count_label.pack(side=tk.LEFT, padx=5)
 
         edit_session_button = ttk.Button(history_action_frame, text="Edit Selected Session", command=self.edit_selected_session, bootstyle="warning-outline")
         edit_session_button.pack(side=tk.RIGHT, padx=5)
@@ -1153,8 +1464,10 @@ class WorkTracker:
             return
 
         session_id = self.history_tree.item(selected_item, 'values')[0]
-        session_details = self.send_db_command('get_session_by_id', (session_id,), expect_result=True)
+        self.send_db_command_async('get_session_by_id', (session_id,), callback=self.open_edit_session_dialog)
 
+    def open_edit_session_dialog(self, session_details):
+        """Builds the edit dialog once the session's details have been read."""
         if not session_details:
             ttk.dialogs.Messagebox.show_error("Could not retrieve session details.", "Error")
             return
@@ -1178,7 +1491,7 @@ class WorkTracker:
 
         ttk.Label(form_frame, text="Category:").grid(row=2, column=0, sticky="w", pady=2)
         self.edit_category_var = tk.StringVar(value=s_category if s_category else "Uncategorized")
-        edit_categories = self.send_db_command('get_all_categories', expect_result=True) + ["Uncategorized"]
+        edit_categories = self.get_available_categories() + ["Uncategorized"]
         self.edit_category_dropdown = ttk.Combobox(
             form_frame, textvariable=self.edit_category_var, values=edit_categories, state="readonly"
         )
@@ -1212,31 +1525,16 @@ class WorkTracker:
             new_start_time = None
             new_end_time = None
 
-            # --- Robust Datetime Parsing ---
+            # --- Datetime Parsing (times typed without an offset are local) ---
             def parse_datetime_string(dt_str, field_name):
                 if not dt_str:
                     return None
-                # Prefer dateutil.parser.parse if available, as it's very robust
-                if DATEUTIL_AVAILABLE:
-                    try:
-                        return date_parse(dt_str)
-                    except (ValueError, TypeError):
-                        pass # Fallback to manual parsing
-                
-                # Fallback 1: ISO format (handles timezone from database)
                 try:
-                    return datetime.datetime.fromisoformat(dt_str)
+                    return timestamps.parse_timestamp(dt_str, naive_as_local=True)
                 except ValueError:
                     pass
 
-                # Fallback 2: Formats without timezone
-                for fmt in ['%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S']:
-                    try:
-                        return datetime.datetime.strptime(dt_str, fmt)
-                    except ValueError:
-                        continue
-                
-                # If all parsing fails
+                # If parsing fails
                 ttk.dialogs.Messagebox.show_error(f"Invalid {field_name} format. Please use a recognized format like 'YYYY-MM-DD HH:MM:SS' or ISO 8601.", "Input Error")
                 return "error"
 
@@ -1255,70 +1553,132 @@ class WorkTracker:
 
             db_category = new_category if new_category != "Uncategorized" else None
 
-            success = self.send_db_command(
+            self.send_db_command_async(
                 'update_full_session',
                 (session_id, new_start_time, new_end_time, db_category, new_notes),
-                expect_result=True
+                callback=lambda success: self.on_edited_session_saved(dialog, success)
             )
 
-            if success:
-                ttk.dialogs.Messagebox.show_info("Session updated successfully!", "Success")
-                dialog.destroy()
-                self.update_history_display()
-            else:
-                ttk.dialogs.Messagebox.show_error("Failed to update session.", "Error")
-
         except Exception as e:
             logging.error(f"Error saving edited session: {e}", exc_info=True)
             ttk.dialogs.Messagebox.show_error(f"An error occurred while saving changes: {e}", "Error")
 
+    def on_edited_session_saved(self, dialog, success):
+        if success:
+            ttk.dialogs.Messagebox.show_info("Session updated successfully!", "Success")
+            if dialog.winfo_exists():
+                dialog.destroy()
+            if self.history_window and self.history_window.winfo_exists():
+                self.update_history_display()
+        else:
+            ttk.dialogs.Messagebox.show_error("Failed to update session.", "Error")
+
 
     def export_data(self):
-        """Allows users to export filtered history data to CSV or Excel."""
-        items = self.history_tree.get_children()
-        if not items:
+        """Streams the sessions matching the current history filters to CSV, JSON Lines, Parquet or Excel."""
+        # None means the count is still loading; the export then runs without a known total
+        if self.history_total_count == 0:
             ttk.dialogs.Messagebox.show_info("No data available in the history view to export.", "Export Data")
             return
 
-        data_to_export = []
-        for item in items:
-            data_to_export.append(self.history_tree.item(item, 'values'))
-
-        columns = ["ID", "Start Time", "End Time", "Category", "Notes"]
-        df = pd.DataFrame(data_to_export, columns=columns)
-
         file_types = [
             ("CSV files", "*.csv"),
+            ("JSON Lines files", "*.jsonl"),
+            ("Parquet files", "*.parquet"),
             ("Excel files", "*.xlsx"),
             ("All files", "*.*")
         ]
 
+        import exporter
+
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=file_types,
             title="Save Work History As"
         )
 
-        if file_path:
+        if not file_path:
+            ttk.dialogs.Messagebox.show_info("Data export cancelled.", "Export Cancelled")
+            return
+
+        export_format = exporter.format_for_path(file_path)
+        if not export_format:
+            ttk.dialogs.Messagebox.show_error("Unsupported file format. Please choose .csv, .jsonl, .parquet or .xlsx.", "Export Error")
+            return
+
+        # Building the query does no I/O, so it is not worth a round trip through the DB thread
+        query, params = self.db.build_export_query(*self.history_filters)
+        total_rows = self.history_total_count
+
+        def progress_text(count):
+            if total_rows is None:
+                return f"Exported {count:,} sessions"
+            return f"Exported {count:,} of {total_rows:,} sessions"
+
+        # --- Progress dialog ---
+        progress_dialog = ttk.Toplevel(title="Exporting Data")
+        progress_dialog.transient(self.history_window)
+        progress_frame = ttk.Frame(progress_dialog, padding=20)
+        progress_frame.pack(expand=True, fill=BOTH)
+        progress_label = ttk.Label(progress_frame, text=progress_text(0))
+        progress_label.pack(fill=X, pady=(0, 10))
+        if total_rows is None:
+            progress_bar = ttk.Progressbar(progress_frame, mode="indeterminate", length=300, bootstyle="info-striped")
+            progress_bar.start()
+        else:
+            progress_bar = ttk.Progressbar(progress_frame, maximum=total_rows, length=300, bootstyle="info-striped")
+        progress_bar.pack(fill=X)
+
+        cancel_event = threading.Event()
+        cancel_button = ttk.Button(progress_frame, text="Cancel", command=cancel_event.set, bootstyle="danger-outline")
+        cancel_button.pack(pady=(10, 0))
+        progress_dialog.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+        # The export thread reports through this queue; the Tk thread polls it
+        export_events = queue.Queue()
+
+        def run_export():
             try:
-                if file_path.lower().endswith('.csv'):
-                    df.to_csv(file_path, index=False)
-                    ttk.dialogs.Messagebox.show_info(f"Data successfully exported to CSV:\n{file_path}", "Export Success")
-                elif file_path.lower().endswith('.xlsx'):
-                    df.to_excel(file_path, index=False)
-                    ttk.dialogs.Messagebox.show_info(f"Data successfully exported to Excel:\n{file_path}", "Export Success")
-                else:
-                    ttk.dialogs.Messagebox.show_error("Unsupported file format. Please choose .csv or .xlsx.", "Export Error")
+                with self.db.read_connection() as connection:
+                    rows_written = exporter.export_sessions(
+                        connection, query, params, file_path, export_format,
+                        progress_callback=lambda count: export_events.put(('progress', count)),
+                        cancel_event=cancel_event
+                    )
+                export_events.put(('done', rows_written))
+            except exporter.ExportCancelled:
+                export_events.put(('cancelled', None))
             except Exception as e:
-                logging.error(f"Error exporting data: {e}")
-                ttk.dialogs.Messagebox.show_error(f"An error occurred during export:\n{e}", "Export Error")
-        else:
-            ttk.dialogs.Messagebox.show_info("Data export cancelled.", "Export Cancelled")
+                logging.error(f"Error exporting data: {e}", exc_info=True)
+                export_events.put(('error', e))
+
+        def poll_export():
+            while True:
+                try:
+                    event, value = export_events.get_nowait()
+                except queue.Empty:
+                    break
+                if event == 'progress':
+                    if total_rows is not None:
+                        progress_bar.configure(value=value)
+                    progress_label.config(text=progress_text(value))
+                    continue
+                progress_dialog.destroy()
+                if event == 'done':
+                    ttk.dialogs.Messagebox.show_info(f"{value:,} sessions exported to:\n{file_path}", "Export Success")
+                elif event == 'cancelled':
+                    ttk.dialogs.Messagebox.show_info("Data export cancelled.", "Export Cancelled")
+                else:
+                    ttk.dialogs.Messagebox.show_error(f"An error occurred during export:\n{value}", "Export Error")
+                return
+            self.root.after(100, poll_export)
+
+        threading.Thread(target=run_export, daemon=True).start()
+        poll_export()
 
     def update_history_display(self):
-        """Updates the history treeview based on selected filters."""
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
+        """Resets the history treeview for the selected filters and loads the first page."""
+        self.history_tree.delete(*self.history_tree.get_children())
 
         date_range = self.history_date_range_var.get()
         category = self.history_category_var.get()
@@ -1337,35 +1697,90 @@ class WorkTracker:
         elif date_range == "This Year":
             start_date = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        sessions = self.send_db_command(
-            'get_filtered_sessions',
-            (start_date, end_date, category, search_text),
-            expect_result=True
+        self.history_filters = (start_date, end_date, category, search_text)
+        self.history_next_key = None
+        self.history_loaded_count = 0
+        self.history_total_count = None
+        self.history_page_loading = False
+        # Results that arrive for an older set of filters are ignored
+        self.history_generation += 1
+        generation = self.history_generation
+
+        self.history_count_label.config(text="Loading sessions...")
+        self.send_db_command_async(
+            'count_filtered_sessions', self.history_filters,
+            callback=lambda count: self.on_history_count(generation, count)
         )
+        self.load_history_page()
 
-        if sessions:
-            for session in sessions:
-                display_session = list(session)
-                if display_session[3] is None:
-                    display_session[3] = "Uncategorized"
-                self.history_tree.insert("", "end", values=display_session)
-        else:
+    def load_history_page(self):
+        """Requests the next page of sessions for the history treeview."""
+        if self.history_page_loading:
+            return
+        self.history_page_loading = True
+        generation = self.history_generation
+        self.send_db_command_async(
+            'get_sessions_page', self.history_filters,
+            kwargs={'after': self.history_next_key, 'limit': self.HISTORY_PAGE_SIZE},
+            callback=lambda result: self.on_history_page(generation, result)
+        )
+
+    def on_history_count(self, generation, count):
+        """Receives the total number of sessions matching the history filters."""
+        if generation != self.history_generation or not self.history_window.winfo_exists():
+            return
+        self.history_total_count = count or 0
+        self.update_history_count_label()
+        if not self.history_total_count:
             ttk.dialogs.Messagebox.show_info("No sessions found matching the filters.", "Work History")
 
+    def on_history_page(self, generation, result):
+        """Appends a page of sessions to the history treeview."""
+        if generation != self.history_generation or not self.history_window.winfo_exists():
+            return
+        sessions, self.history_next_key = result or ([], None)
+        self.history_page_loading = False
+
+        for session in sessions:
+            display_session = list(session)
+            if display_session[3] is None:
+                display_session[3] = "Uncategorized"
+            self.history_tree.insert("", "end", values=display_session)
+
+        self.history_loaded_count += len(sessions)
+        self.update_history_count_label()
+
+    def update_history_count_label(self):
+        """Shows how many of the matching sessions are loaded."""
+        if self.history_total_count is None:
+            self.history_count_label.config(text=f"Showing {self.history_loaded_count:,} sessions")
+        elif self.history_total_count:
+            self.history_count_label.config(
+                text=f"Showing {self.history_loaded_count:,} of {self.history_total_count:,} sessions")
+        else:
+            self.history_count_label.config(text="No sessions")
+
+    def on_history_scroll(self, first, last):
+        """Keeps the scrollbar in sync and loads another page when nearing the bottom."""
+        self.history_scrollbar.set(first, last)
+        if self.history_next_key is not None and float(last) >= 0.9:
+            self.load_history_page()
+
     def show_statistics(self):
         """Displays the statistics window."""
         if self.statistics_window and tk.Toplevel.winfo_exists(self.statistics_window):
             self.statistics_window.lift()
             return
 
+        import numpy as np
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import stats_engine
+
         self.statistics_window = ttk.Toplevel(title="Statistics")
         self.statistics_window.geometry("800x600")
 
-        all_categories_from_db = self.send_db_command('get_all_categories', expect_result=True)
-        if all_categories_from_db is None:
-            all_categories_from_db = []
-        categories = ["All"] + all_categories_from_db + ["Uncategorized"]
-
         # --- Main Stats Frame ---
         stats_main_frame = ttk.Frame(self.statistics_window, padding=20)
         stats_main_frame.pack(expand=True, fill=BOTH)
@@ -1383,7 +1798,8 @@ class WorkTracker:
         category_var = tk.StringVar(self.statistics_window)
         category_var.set("All")
         category_dropdown = ttk.Combobox(
-            filter_frame, textvariable=category_var, values=categories, state="readonly", bootstyle="info")
+            filter_frame, textvariable=category_var, values=["All"] + self.get_available_categories() + ["Uncategorized"],
+            state="readonly", bootstyle="info")
         category_dropdown.pack(side=LEFT)
 
         # --- Scorecard ---
@@ -1394,162 +1810,92 @@ class WorkTracker:
         chart_frame = ttk.Frame(stats_main_frame)
         chart_frame.pack(expand=True, fill=BOTH)
 
+        # One figure and canvas live as long as the window; redraws only change the bars.
+        # A plain Figure (not pyplot) is not tracked globally, so it is freed with the window.
+        colors = self.root.style.colors
+        with matplotlib.style.context('dark_background'):
+            figure = Figure(figsize=(8, 4))
+            ax = figure.add_subplot()
+        figure.patch.set_facecolor(colors.bg)
+        ax.set_facecolor(colors.bg)
+        ax.tick_params(axis='x', colors=colors.fg)
+        ax.tick_params(axis='y', colors=colors.fg)
+        for spine in ax.spines.values():
+            spine.set_color(colors.fg)
+        canvas = FigureCanvasTkAgg(figure, master=chart_frame)
+        canvas_widget = canvas.get_tk_widget()
+        # The bars currently drawn and the labels they were drawn for
+        chart = {'bars': None, 'labels': None}
+
+        statistics_window = self.statistics_window
+
+        def close_statistics():
+            canvas_widget.destroy()
+            figure.clear()
+            statistics_window.destroy()
+
+        statistics_window.protocol("WM_DELETE_WINDOW", close_statistics)
+        # Only the newest request is drawn when the dropdowns change faster than the DB answers
+        latest_request = [0]
 
         def update_stats():
-            """Updates the statistics graph and scorecard."""
+            """Requests the rollup rows for the selected view and category."""
             view = view_var.get()
             category = category_var.get()
+            latest_request[0] += 1
+            request_id = latest_request[0]
+
+            # Only the hourly rollup rows of the displayed period are needed, not the whole history
+            period_start_utc, _ = stats_engine.period_bounds(view)
+            self.send_db_command_async(
+                'get_rollup', (period_start_utc, category),
+                callback=lambda rollup_rows: draw_stats(request_id, view, category, rollup_rows)
+            )
 
-            daily_average = 0.0
-
-            all_sessions_data = self.send_db_command('get_sessions', expect_result=True)
-
-            # Clear previous chart
-            for widget in chart_frame.winfo_children():
-                widget.destroy()
-
-            if not all_sessions_data:
-                ttk.dialogs.Messagebox.show_info("No data available for the selected filters.", "Statistics")
-                self.scorecard_label.config(text=f"Average Duration ({view}): 0 minutes")
-                return
-
-            df = pd.DataFrame(all_sessions_data, columns=["ID", "start_time", "end_time", "category", "notes"])
-
-            if df.empty:
-                ttk.dialogs.Messagebox.show_info("No data available for the selected filters (after DataFrame creation).", "Statistics")
-                self.scorecard_label.config(text=f"Average Duration ({view}): 0 minutes")
+        def draw_stats(request_id, view, category, rollup_rows):
+            """Updates the statistics graph and scorecard."""
+            if request_id != latest_request[0] or not statistics_window.winfo_exists():
                 return
 
-            # Data preparation - Use format='mixed' for robust datetime parsing and force UTC
-            df['start_time'] = pd.to_datetime(df['start_time'], format='mixed', utc=True, errors='coerce')
-            df['end_time'] = pd.to_datetime(df['end_time'], format='mixed', utc=True, errors='coerce')
-            
-            # Filter out sessions where either start_time or end_time could not be parsed (are NaT)
-            # or where end_time is missing (ongoing sessions)
-            df_completed = df.dropna(subset=['start_time', 'end_time']).copy()
-            
-            if df_completed.empty:
-                ttk.dialogs.Messagebox.show_info("No completed sessions to display for the selected filters.", "Statistics")
+            if not rollup_rows:
+                canvas_widget.pack_forget()
+                ttk.dialogs.Messagebox.show_info("No data available for the selected filters.", "Statistics")
                 self.scorecard_label.config(text=f"Average Duration ({view}): 0 minutes")
                 return
 
-            df_completed.loc[:, 'duration'] = (df_completed['end_time'] - df_completed['start_time']).dt.total_seconds() / 60
-
-            df_completed.loc[:, 'category'] = df_completed['category'].fillna('Uncategorized')
-
-            if category != "All":
-                df_completed = df_completed[df_completed['category'] == category].copy()
-                if df_completed.empty:
-                    ttk.dialogs.Messagebox.show_info("No completed sessions available for the selected category.", "Statistics")
-                    self.scorecard_label.config(text=f"Average Duration ({view}): 0 minutes")
-                    return
-
-
-            # --- Crucial Fix: Ensure comparison dates are timezone-aware (UTC) ---
-            # Get current time in UTC
-            now_utc = datetime.datetime.now(datetime.timezone.utc)
-            
-            grouped = None
-            y_axis_label = "Minutes" # Default label
-
-            if view == "Daily":
-                start_of_today_utc = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-                df_filtered = df_completed[df_completed['start_time'] >= start_of_today_utc].copy()
-                if not df_filtered.empty:
-                    df_filtered.loc[:, 'hour'] = df_filtered['start_time'].dt.hour
-                    all_hours = list(range(24))
-                    grouped = df_filtered.groupby('hour')['duration'].sum().reindex(all_hours, fill_value=0)
-                    daily_average = grouped.mean()
-
-            elif view == "Weekly":
-                # Get start of week (Monday) in UTC
-                start_of_week_utc = now_utc - datetime.timedelta(days=now_utc.weekday())
-                start_of_week_utc = start_of_week_utc.replace(hour=0, minute=0, second=0, microsecond=0) # Ensure start of day
-                
-                df_filtered = df_completed[df_completed['start_time'] >= start_of_week_utc].copy()
-                if not df_filtered.empty:
-                    df_filtered.loc[:, 'day'] = df_filtered['start_time'].dt.day_name()
-                    all_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                    grouped = df_filtered.groupby('day')['duration'].sum().reindex(all_days, fill_value=0)
-                    daily_average = grouped.mean()
-
-            elif view == "Monthly":
-                # Start of month in UTC
-                start_of_month_utc = now_utc.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                df_filtered = df_completed[(df_completed['start_time'] >= start_of_month_utc) & (df_completed['start_time'].dt.month == now_utc.month) & (df_completed['start_time'].dt.year == now_utc.year)].copy()
-                if not df_filtered.empty:
-                    df_filtered.loc[:, 'day'] = df_filtered['start_time'].dt.day
-                    num_days_in_current_month = (now_utc.replace(month=now_utc.month % 12 + 1, day=1) - datetime.timedelta(days=1)).day
-                    days_in_month_range = list(range(1, num_days_in_current_month + 1))
-                    grouped = df_filtered.groupby('day')['duration'].sum().reindex(days_in_month_range, fill_value=0)
-                    daily_average = grouped.mean()
-
-            elif view == "Yearly":
-                # Start of year in UTC
-                start_of_year_utc = now_utc.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-                df_filtered = df_completed[df_completed['start_time'] >= start_of_year_utc].copy()
-                if not df_filtered.empty:
-                    df_filtered.loc[:, 'month'] = df_filtered['start_time'].dt.month_name()
-                    all_months = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-                    grouped = df_filtered.groupby('month')['duration'].sum().reindex(all_months, fill_value=0)
-                    daily_average = grouped.mean()
-
-            # Ensure daily_average is not NaN if grouped is empty after reindex (e.g., no data for a given period)
-            if pd.isna(daily_average):
-                daily_average = 0.0
-            
-            # New logic to switch between minutes and hours for the chart and format scorecard text
-            scorecard_text = ""
-            if grouped is not None and not grouped.empty and grouped.max() > 60:
-                grouped = grouped / 60
-                y_axis_label = "Hours"
-                
-                # Format scorecard for hours and minutes
-                total_avg_minutes = daily_average
-                avg_hours = int(total_avg_minutes // 60)
-                avg_rem_minutes = int(round(total_avg_minutes % 60))
-                
-                hour_str = f"{avg_hours} hour" + ("s" if avg_hours != 1 else "")
-                minute_str = f"{avg_rem_minutes} minute" + ("s" if avg_rem_minutes != 1 else "")
-
-                if avg_hours > 0 and avg_rem_minutes > 0:
-                    scorecard_text = f"{hour_str}, {minute_str}"
-                elif avg_hours > 0:
-                    scorecard_text = hour_str
+            # Each rollup row stands for all completed sessions that started in one UTC hour,
+            # so it can be fed to the engine as a single session of the summed length
+            bucket_epochs = np.array([row[0] for row in rollup_rows], dtype=np.int64)
+            total_seconds = np.array([row[2] for row in rollup_rows], dtype=np.int64)
+            result = stats_engine.view_statistics(bucket_epochs, bucket_epochs + total_seconds, view)
+            scorecard_text = result['scorecard_text']
+
+            if result['has_data']:
+                labels = [str(label) for label in result['labels']]
+                if labels == chart['labels']:
+                    # Same buckets as before: just change the bar heights
+                    for bar, value in zip(chart['bars'], result['values']):
+                        bar.set_height(value)
+                    ax.relim()
+                    ax.autoscale_view()
                 else:
-                    scorecard_text = minute_str
-            else:
-                # Format scorecard for minutes
-                scorecard_text = f"{daily_average:.2f} minutes"
-
-
-            if grouped is not None and not grouped.empty and grouped.sum() > 0:
-                plt.style.use('dark_background')
-                fig, ax = plt.subplots(figsize=(8, 4))
-                
-                # Use ttkbootstrap colors
-                colors = self.root.style.colors
-                grouped.plot(kind='bar', ax=ax, color=colors.primary)
-                
-                ax.set_ylabel(y_axis_label, color=colors.fg)
+                    if chart['bars'] is not None:
+                        chart['bars'].remove()
+                    positions = np.arange(len(labels))
+                    chart['bars'] = ax.bar(positions, result['values'], color=colors.primary)
+                    chart['labels'] = labels
+                    ax.set_xticks(positions, labels, rotation=90)
+                    ax.relim()
+                    ax.autoscale_view()
+
+                ax.set_ylabel(result['unit'], color=colors.fg)
                 ax.set_title(f"{view} Statistics for {category} Category", color=colors.fg)
-                
-                fig.patch.set_facecolor(colors.bg)
-                ax.set_facecolor(colors.bg)
-                
-                ax.tick_params(axis='x', colors=colors.fg)
-                ax.tick_params(axis='y', colors=colors.fg)
-                ax.spines['bottom'].set_color(colors.fg)
-                ax.spines['top'].set_color(colors.fg) 
-                ax.spines['right'].set_color(colors.fg)
-                ax.spines['left'].set_color(colors.fg)
-
-                fig.tight_layout()
-
-                canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-                canvas.draw()
-                canvas.get_tk_widget().pack(expand=True, fill=BOTH)
+                figure.tight_layout()
+                canvas.draw_idle()
+                if not canvas_widget.winfo_manager():
+                    canvas_widget.pack(expand=True, fill=BOTH)
             else:
+                canvas_widget.pack_forget()
                 ttk.dialogs.Messagebox.show_info("No work data to display for the selected period and category.", "Statistics")
                 scorecard_text = "0 minutes" # Default back to minutes if no data
 
@@ -1562,281 +1908,107 @@ class WorkTracker:
                                lambda event: update_stats())
 
 
-class Database:
-    def __init__(self, db_path):
-        self.db_path = db_path
-        self.conn = None
-        self.cursor = None
-        self.connect()
-
-    def connect(self):
-        """Establishes connection to the database."""
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            logging.info(f"Database connected at {self.db_path}")
-        except sqlite3.Error as e:
-            logging.error(f"Error connecting to database: {e}")
-            self.conn = None
-            self.cursor = None
-
-    def create_tables(self):
-        """Creates both sessions, categories, and settings tables."""
-        if not self.conn:
-            logging.error("Cannot create tables: No database connection.")
-            return
-
-        self.cursor.execute(
-            """
-                CREATE TABLE IF NOT EXISTS sessions(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    start_time TEXT,
-                    end_time TEXT,
-                    category TEXT,
-                    notes TEXT
-                )
-            """
-        )
-        logging.info("Sessions table checked/created.")
-
-        self.cursor.execute(
-            """
-                CREATE TABLE IF NOT EXISTS categories(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL
-                )
-            """
-        )
-        self.conn.commit()
-        logging.info("Categories table checked/created.")
-
-        self.cursor.execute(
-            """
-                CREATE TABLE IF NOT EXISTS settings(
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-            """
-        )
-        self.conn.commit()
-        logging.info("Settings table checked/created.")
-
-        self.cursor.execute("SELECT COUNT(*) FROM categories")
-        if self.cursor.fetchone()[0] == 0:
-            default_categories = ["Work", "Skill", "School"]
-            for category in default_categories:
-                try:
-                    self.cursor.execute("INSERT INTO categories (name) VALUES (?)", (category,))
-                    self.conn.commit()
-                    logging.info(f"Default category '{category}' added to categories table.")
-                except sqlite3.IntegrityError:
-                    logging.warning(f"Default category '{category}' already exists, skipping.")
-                except Exception as e:
-                    logging.error(f"Error adding default category '{category}': {e}")
-            logging.info("Default categories ensured in dedicated table.")
-
-
-    def insert_session(self, start_time, end_time, category, notes):
-        try:
-            # Convert to UTC before storing
-            start_time_str = start_time.astimezone(datetime.timezone.utc).isoformat() if start_time else None
-            end_time_str = end_time.astimezone(datetime.timezone.utc).isoformat() if end_time else None
-
-            self.cursor.execute("""
-                INSERT INTO sessions (start_time, end_time, category, notes) VALUES (?,?,?,?)
-                """, (start_time_str, end_time_str, category, notes))
-            self.conn.commit()
-            last_id = self.cursor.lastrowid
-            logging.info(f"Session inserted. ID: {last_id}")
-            return last_id
-        except Exception as e:
-            logging.error(f"Error inserting session into DB: {e}", exc_info=True)
-            return None
-
-    def update_session(self, session_id, end_time, notes):
-        try:
-            # Convert to UTC before storing
-            end_time_str = end_time.astimezone(datetime.timezone.utc).isoformat() if end_time else None
-
-            self.cursor.execute("""
-                UPDATE sessions
-                SET end_time = ?, notes = ?
-                WHERE id = ?
-            """, (end_time_str, notes, session_id))
-            self.conn.commit()
-            logging.info(f"Session updated. ID: {session_id}")
-        except Exception as e:
-            logging.error(f"Error updating session: {e}")
-            return False
-
-    def update_full_session(self, session_id, start_time, end_time, category, notes):
-        """Updates all fields of a session in the database."""
-        try:
-            # Convert to UTC before storing
-            start_time_str = start_time.astimezone(datetime.timezone.utc).isoformat() if start_time else None
-            end_time_str = end_time.astimezone(datetime.timezone.utc).isoformat() if end_time else None
-
-            self.cursor.execute("""
-                UPDATE sessions
-                SET start_time = ?, end_time = ?, category = ?, notes = ?
-                WHERE id = ?
-            """, (start_time_str, end_time_str, category, notes, session_id))
-            self.conn.commit()
-            logging.info(f"Full session updated. ID: {session_id}")
-            return True
-        except Exception as e:
-            logging.error(f"Error updating full session: {e}")
-            return False
-
-    def get_session_by_id(self, session_id):
-        """Gets a single session by its ID."""
-        try:
-            self.cursor.execute("SELECT id, start_time, end_time, category, notes FROM sessions WHERE id = ?", (session_id,))
-            session = self.cursor.fetchone()
-            logging.info(f"Session {session_id} retrieved.")
-            return session
-        except Exception as e:
-            logging.error(f"Error getting session by ID {session_id}: {e}")
-            return None
-
-    def get_sessions(self):
-        """Gets all sessions from database."""
-        try:
-            self.cursor.execute("SELECT id, start_time, end_time, category, notes FROM sessions")
-            sessions = self.cursor.fetchall()
-            logging.info("Sessions retrieved")
-            return sessions
-        except Exception as e:
-            logging.error(f"Error getting sessions: {e}")
-            return []
-
-    def get_filtered_sessions(self, start_date=None, end_date=None, category=None, search_text=None):
-        """Gets sessions from database based on filters."""
-        try:
-            query = "SELECT id, start_time, end_time, category, notes FROM sessions WHERE 1=1"
-            params = []
-
-            if start_date:
-                # Ensure start_date is timezone-aware before converting to ISO for query
-                if start_date.tzinfo is None:
-                    start_date = start_date.astimezone(datetime.timezone.utc)
-                query += " AND start_time >= ?"
-                params.append(start_date.isoformat())
-            if end_date:
-                # Ensure end_date is timezone-aware before converting to ISO for query
-                if end_date.tzinfo is None:
-                    end_date = end_date.astimezone(datetime.timezone.utc)
-                query += " AND start_time <= ?"
-                if end_date.hour == 0 and end_date.minute == 0 and end_date.second == 0:
-                    end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-                params.append(end_date.isoformat())
-
-            if category and category != "All":
-                if category == "Uncategorized":
-                    query += " AND category IS NULL"
-                else:
-                    query += " AND category = ?"
-                    params.append(category)
-
-            if search_text:
-                search_pattern = f"%{search_text}%"
-                query += " AND (notes LIKE ? OR category LIKE ?)"
-                params.append(search_pattern)
-                params.append(search_pattern)
-
-            query += " ORDER BY start_time DESC"
+class StartupSequencer:
+    """Runs named startup stages as soon as the stages they depend on have finished.
 
-            self.cursor.execute(query, tuple(params))
-            sessions = self.cursor.fetchall()
-            logging.info(f"Filtered sessions retrieved. Query: {query}, Params: {params}")
-            return sessions
-        except Exception as e:
-            logging.error(f"Error getting filtered sessions: {e}")
-            return []
+    A stage is a function called on the Tk thread with a `done` callback, which it calls
+    (from any thread, possibly much later) once its work is complete. All stages whose
+    dependencies are met start together, so independent stages overlap.
 
-    def get_all_categories(self):
-        """Gets all category names from the dedicated categories table."""
-        try:
-            self.cursor.execute("SELECT name FROM categories ORDER BY name")
-            categories = [row[0] for row in self.cursor.fetchall()]
-            logging.info("All categories retrieved from dedicated table.")
-            return categories
-        except Exception as e:
-            logging.error(f"Error getting all categories: {e}")
-            return []
+    `done` from a worker thread only queues the stage's completion through call_on_ui_thread,
+    which the Tk thread polls; it never calls Tk itself.
+    """
 
-    def insert_category(self, category_name):
-        """Inserts a new category into the dedicated categories table."""
-        try:
-            self.cursor.execute("INSERT INTO categories (name) VALUES (?)", (category_name,))
-            self.conn.commit()
-            logging.info(f"Category '{category_name}' inserted into dedicated table.")
-            return True
-        except sqlite3.IntegrityError:
-            logging.warning(f"Category '{category_name}' already exists in dedicated table.")
-            return False
-        except Exception as e:
-            logging.error(f"Error inserting category '{category_name}': {e}")
-            return False
+    def __init__(self, call_on_ui_thread):
+        self.call_on_ui_thread = call_on_ui_thread
+        self.stages = {} # name -> (function, names of the stages it waits for)
+        self.started = set()
+        self.finished = set()
+        self.started_at = time.perf_counter()
 
-    def rename_category(self, old_category, new_category):
-        """Renames a category in the categories table and updates associated sessions."""
-        try:
-            self.cursor.execute("SELECT 1 FROM categories WHERE name = ? LIMIT 1", (new_category,))
-            if self.cursor.fetchone():
-                logging.warning(f"Cannot rename '{old_category}' to '{new_category}': New category name already exists.")
-                return False
-
-            self.cursor.execute("UPDATE categories SET name = ? WHERE name = ?", (new_category, old_category))
-            self.cursor.execute("UPDATE sessions SET category = ? WHERE category = ?", (new_category, old_category))
-            self.conn.commit()
-            logging.info(f"Category '{old_category}' renamed to '{new_category}' and sessions updated.")
-            return True
-        except Exception as e:
-            logging.error(f"Error renaming category: {e}")
-            return False
+    def add(self, name, function, after=()):
+        self.stages[name] = (function, tuple(after))
 
-    def delete_category_from_db(self, category_name):
-        """Deletes a category from the categories table and updates associated sessions."""
-        try:
-            self.cursor.execute("UPDATE sessions SET category = NULL WHERE category = ?", (category_name,))
-            self.cursor.execute("DELETE FROM categories WHERE name = ?", (category_name,))
-            self.conn.commit()
-            logging.info(f"Category '{category_name}' deleted from categories table and sessions updated.")
-            return True
-        except Exception as e:
-            logging.error(f"Error deleting category '{category_name}': {e}")
-            return False
+    def start(self):
+        self._start_ready_stages()
 
-    def get_setting(self, key):
-        """Retrieves a setting value by its key."""
-        try:
-            self.cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-            result = self.cursor.fetchone()
-            return result[0] if result else None
-        except Exception as e:
-            logging.error(f"Error getting setting '{key}': {e}")
-            return None
+    def _start_ready_stages(self):
+        for name, (function, after) in self.stages.items():
+            if name in self.started or not all(dependency in self.finished for dependency in after):
+                continue
+            self.started.add(name)
+            try:
+                function(lambda name=name: self._stage_done(name))
+            except Exception as e:
+                logging.error(f"Startup stage '{name}' failed: {e}", exc_info=True)
 
-    def set_setting(self, key, value):
-        """Inserts or updates a setting key-value pair."""
-        try:
-            self.cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
-            self.conn.commit()
-            logging.info(f"Setting '{key}' set to '{value}'.")
-            return True
-        except Exception as e:
-            logging.error(f"Error setting setting '{key}': {e}")
-            return False
+    def _stage_done(self, name):
+        if threading.current_thread() is threading.main_thread():
+            # Finished on the Tk thread itself: go on without waiting for the next queue poll
+            self._finish(name)
+        else:
+            self.call_on_ui_thread(self._finish, name)
 
-    def close(self):
-        """Closes the database connection."""
-        if self.conn:
-            self.conn.close()
-            logging.info("Database connection closed.")
+    def _finish(self, name):
+        if name in self.finished:
+            return
+        self.finished.add(name)
+        logging.info(f"Startup stage '{name}' ready after {(time.perf_counter() - self.started_at) * 1000:.0f} ms")
+        self._start_ready_stages()
+
+
+class TrayIconRenderer:
+    """Draws tray icons showing an elapsed time such as "1:05" (hours:minutes).
+
+    Every glyph is rendered once into an atlas; icons are then composed by pasting glyphs,
+    so no text layout or font rasterizing happens while a session runs.
+    """
+
+    SIZE = 64
+    CHARACTERS = "0123456789:"
+    FONT_SIZE = 28
+    GLYPH_SPACING = 1
+
+    def __init__(self):
+        font = ImageFont.load_default(size=self.FONT_SIZE)
+        self.glyphs = {}
+        for char in self.CHARACTERS:
+            left, top, right, bottom = font.getbbox(char)
+            glyph = Image.new("L", (right - left, bottom - top), 0)
+            ImageDraw.Draw(glyph).text((-left, -top), char, fill=255, font=font)
+            self.glyphs[char] = glyph
+        # All glyphs share one baseline and height so the digits line up
+        self.glyph_height = max(glyph.height for glyph in self.glyphs.values())
+
+    @staticmethod
+    def format_elapsed(elapsed_seconds):
+        """Returns the "H:MM" text shown for an elapsed time."""
+        total_minutes = int(elapsed_seconds // 60)
+        return f"{total_minutes // 60}:{total_minutes % 60:02d}"
+
+    def render(self, text):
+        """Composes an icon image for text made of CHARACTERS."""
+        glyphs = [self.glyphs[char] for char in text]
+        width = sum(glyph.width for glyph in glyphs) + self.GLYPH_SPACING * (len(glyphs) - 1)
+        strip = Image.new("L", (width, self.glyph_height), 0)
+        x = 0
+        for glyph in glyphs:
+            strip.paste(glyph, (x, self.glyph_height - glyph.height))
+            x += glyph.width + self.GLYPH_SPACING
+
+        # Long times ("12:34") are shrunk to fit the icon
+        if strip.width > self.SIZE - 4:
+            strip = strip.resize((self.SIZE - 4, max(1, strip.height * (self.SIZE - 4) // strip.width)), Image.LANCZOS)
+
+        image = Image.new("RGB", (self.SIZE, self.SIZE), color=(255, 255, 255))
+        image.paste((0, 0, 0), ((self.SIZE - strip.width) // 2, (self.SIZE - strip.height) // 2), strip)
+        return image
 
 
 if __name__ == "__main__":
     root = ttk.Window(themename="vapor")
     app = WorkTracker(root)
+    if os.environ.get("WORKTRACKER_EXIT_WHEN_READY"):
+        # Used by benchmarks/startup_time.py: report once the first window is drawn, then quit
+        root.after_idle(lambda: (print("WORKTRACKER_READY", flush=True), root.destroy()))
     root.mainloop()
@@ -0,0 +1,159 @@
+"""Headless statistics engine for Work Tracker.
+
+All functions take NumPy arrays of UTC epoch seconds (and optional integer category
+codes) and return plain Python/NumPy values, so they can be used by the Tk window,
+exports, cloud sync or scripts without a display.
+"""
+import datetime
+
+import numpy as np
+
+VIEWS = ["Daily", "Weekly", "Monthly", "Yearly"]
+WEEKDAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_LABELS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+                'September', 'October', 'November', 'December']
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+
+def period_bounds(view, now=None):
+    """Returns the (start, end) UTC datetimes of the period shown by a view."""
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    now = now.astimezone(datetime.timezone.utc)
+    start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if view == "Daily":
+        return start_of_today, start_of_today + datetime.timedelta(days=1)
+    if view == "Weekly":
+        start_of_week = start_of_today - datetime.timedelta(days=now.weekday())
+        return start_of_week, start_of_week + datetime.timedelta(days=7)
+    if view == "Monthly":
+        start_of_month = start_of_today.replace(day=1)
+        return start_of_month, (start_of_month + datetime.timedelta(days=32)).replace(day=1)
+    if view == "Yearly":
+        start_of_year = start_of_today.replace(month=1, day=1)
+        return start_of_year, start_of_year.replace(year=start_of_year.year + 1)
+    raise ValueError(f"Unknown statistics view: {view}")
+
+
+def session_minutes(start_epochs, end_epochs):
+    """Returns per-session durations in minutes; sessions without an end are NaN."""
+    start = np.asarray(start_epochs, dtype=np.float64)
+    end = np.asarray(end_epochs, dtype=np.float64)
+    return (end - start) / 60
+
+
+def bucket_minutes(start_epochs, end_epochs, view, category_codes=None, category_code=None, now=None):
+    """Sums completed session minutes into the buckets of a view.
+
+    Daily buckets are the 24 UTC hours of today, Weekly the days of this week, Monthly the
+    days of this month and Yearly the months of this year. Each session counts towards the
+    bucket it started in. Returns (labels, minutes) where minutes is a float array.
+    """
+    period_start, period_end = period_bounds(view, now)
+    start = np.asarray(start_epochs, dtype=np.float64)
+    minutes = session_minutes(start_epochs, end_epochs)
+
+    mask = ~np.isnan(minutes) & (start >= period_start.timestamp()) & (start < period_end.timestamp())
+    if category_code is not None and category_codes is not None:
+        mask &= np.asarray(category_codes) == category_code
+
+    start = start[mask].astype(np.int64)
+    minutes = minutes[mask]
+
+    if view == "Daily":
+        labels = list(range(24))
+        bucket = (start // SECONDS_PER_HOUR) % 24
+    elif view == "Weekly":
+        labels = WEEKDAY_LABELS
+        # 1970-01-01 was a Thursday, so shift by three to make Monday bucket 0
+        bucket = (start // SECONDS_PER_DAY + 3) % 7
+    elif view == "Monthly":
+        labels = list(range(1, (period_end - period_start).days + 1))
+        bucket = (start - int(period_start.timestamp())) // SECONDS_PER_DAY
+    else:
+        labels = MONTH_LABELS
+        start_days = start.astype('datetime64[s]')
+        bucket = (start_days.astype('datetime64[M]') - start_days.astype('datetime64[Y]')).astype(np.int64)
+
+    totals = np.bincount(bucket, weights=minutes, minlength=len(labels))
+    return labels, totals[:len(labels)]
+
+
+def format_minutes(total_minutes):
+    """Formats a number of minutes as 'H hours, M minutes'."""
+    hours = int(total_minutes // 60)
+    remaining_minutes = int(round(total_minutes % 60))
+
+    hour_str = f"{hours} hour" + ("s" if hours != 1 else "")
+    minute_str = f"{remaining_minutes} minute" + ("s" if remaining_minutes != 1 else "")
+
+    if hours > 0 and remaining_minutes > 0:
+        return f"{hour_str}, {minute_str}"
+    if hours > 0:
+        return hour_str
+    return minute_str
+
+
+def view_statistics(start_epochs, end_epochs, view, category_codes=None, category_code=None, now=None):
+    """Computes the chart series and scorecard for one statistics view.
+
+    Returns a dict with labels, values (in `unit`), unit ("Minutes" or "Hours"),
+    average_minutes, scorecard_text and has_data.
+    """
+    labels, totals = bucket_minutes(start_epochs, end_epochs, view, category_codes, category_code, now)
+    average_minutes = float(totals.mean()) if totals.size else 0.0
+    has_data = bool(totals.size and totals.sum() > 0)
+
+    # Switch the chart to hours once any bucket exceeds an hour
+    if has_data and totals.max() > 60:
+        values = totals / 60
+        unit = "Hours"
+        scorecard_text = format_minutes(average_minutes)
+    else:
+        values = totals
+        unit = "Minutes"
+        scorecard_text = f"{average_minutes:.2f} minutes" if has_data else "0 minutes"
+
+    return {
+        'labels': labels,
+        'values': values,
+        'unit': unit,
+        'average_minutes': average_minutes,
+        'scorecard_text': scorecard_text,
+        'has_data': has_data,
+    }
+
+
+def daily_totals(start_epochs, end_epochs, utc_offset_seconds=0):
+    """Aggregates completed sessions per calendar day in a fixed UTC offset.
+
+    Returns a dict mapping ISO date strings to dicts with total_minutes,
+    longest_session_minutes and total_sessions.
+    """
+    start = np.asarray(start_epochs, dtype=np.float64)
+    minutes = session_minutes(start_epochs, end_epochs)
+    mask = ~np.isnan(minutes) & ~np.isnan(start)
+    if not mask.any():
+        return {}
+
+    days = ((start[mask].astype(np.int64) + utc_offset_seconds) // SECONDS_PER_DAY)
+    minutes = minutes[mask]
+
+    unique_days, bucket = np.unique(days, return_inverse=True)
+    totals = np.bincount(bucket, weights=minutes)
+    counts = np.bincount(bucket)
+    longest = np.full(unique_days.size, -np.inf)
+    np.maximum.at(longest, bucket, minutes)
+
+    epoch_day = datetime.date(1970, 1, 1)
+    return {
+        (epoch_day + datetime.timedelta(days=int(day))).isoformat(): {
+            'total_minutes': float(total),
+            'longest_session_minutes': float(max(longest_minutes, 0.0)),
+            'total_sessions': int(count),
+        }
+        for day, total, longest_minutes, count in zip(unique_days, totals, longest, counts)
+    }
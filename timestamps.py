@@ -0,0 +1,69 @@
+"""Timestamp formatting and parsing shared by Work Tracker modules.
+
+Session times are stored in one canonical form: UTC, ISO 8601, whole seconds and an
+explicit offset, e.g. "2024-05-01T08:30:00+00:00". Such strings parse on the fast
+datetime.fromisoformat path; other forms found in older rows or typed by the user fall
+back to dateutil when it is installed.
+"""
+import datetime
+import functools
+
+CANONICAL_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+
+
+def format_timestamp(value):
+    """Returns the canonical string for a datetime (naive values are treated as local time)."""
+    if value is None:
+        return None
+    return value.astimezone(datetime.timezone.utc).strftime(CANONICAL_FORMAT)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(text, naive_as_local=False):
+    """Parses a timestamp string into an aware UTC datetime.
+
+    Naive values are taken as UTC, which is how older versions stored them, or as local
+    time with naive_as_local=True (for times typed by the user). Raises ValueError for
+    text that cannot be parsed.
+    """
+    text = text.strip()
+    try:
+        # fromisoformat only understands a trailing "Z" from Python 3.11 on
+        parsed = datetime.datetime.fromisoformat(text[:-1] + "+00:00" if text.endswith("Z") else text)
+    except ValueError:
+        try:
+            from dateutil.parser import parse as date_parse
+        except ImportError:
+            raise ValueError(f"Unrecognized timestamp: {text!r}")
+        try:
+            parsed = date_parse(text)
+        except (ValueError, OverflowError) as e:
+            raise ValueError(f"Unrecognized timestamp: {text!r}") from e
+
+    if parsed.tzinfo is None:
+        if naive_as_local:
+            parsed = parsed.astimezone()
+        else:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def canonical_timestamp(text):
+    """Rewrites a stored timestamp string in the canonical form; None and '' stay None."""
+    if not text:
+        return None
+    return format_timestamp(parse_timestamp(text))
+
+
+def datetime_to_epoch(value):
+    """Converts a datetime to integer UTC epoch seconds (naive values are treated as local time)."""
+    if value is None:
+        return None
+    return int(value.astimezone(datetime.timezone.utc).timestamp())
+
+
+def timestamp_to_epoch(text):
+    """Converts a stored timestamp string to integer UTC epoch seconds (naive values are treated as UTC)."""
+    if not text:
+        return None
+    return int(parse_timestamp(text).timestamp())